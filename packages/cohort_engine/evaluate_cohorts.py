@@ -18,80 +18,177 @@ Outputs:
 """
 
 import argparse
+import functools
 import json
+import mmap
 import pickle
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+import joblib
 import numpy as np
+import sklearn
 from sklearn.metrics import silhouette_score, adjusted_rand_score
 from sklearn.model_selection import train_test_split
 
+# Larger chunk budget for pairwise distance computations (silhouette)
+sklearn.set_config(working_memory=1024)
+
 
+@functools.lru_cache(maxsize=1)
 def load_signals_schema() -> Dict[str, Any]:
-    """Load canonical signals_v1 schema."""
+    """Load canonical signals_v1 schema (cached after first call)."""
     schema_path = Path("./ml/schemas/signals_v1_schema.json")
-    
+
     if not schema_path.exists():
         raise FileNotFoundError(
             f"Schema file not found: {schema_path}\n"
             "Run: node scripts/export_signals_schema.mjs"
         )
-    
-    with open(schema_path, "r") as f:
-        return json.load(f)
+
+    return _loads(schema_path.read_bytes())
 
 
 def load_model(model_dir: str) -> Dict[str, Any]:
-    """Load model from directory."""
-    
+    """Load model from directory (joblib with mmap, pickle fallback)."""
+
+    joblib_path = Path(model_dir) / "model.joblib"
+
+    if joblib_path.exists():
+        return joblib.load(joblib_path, mmap_mode="r")
+
     model_path = Path(model_dir) / "model.pkl"
-    
+
     if not model_path.exists():
-        raise FileNotFoundError(f"Model not found: {model_path}")
-    
+        raise FileNotFoundError(f"Model not found: {joblib_path} (or legacy {model_path})")
+
     with open(model_path, "rb") as f:
         model_data = pickle.load(f)
-    
+
     return model_data
 
 
-def load_training_data(data_path: str, feature_keys: list) -> np.ndarray:
-    """Load training data (same as train_cohorts.py)."""
-    
-    import pandas as pd
-    
+# Rows parsed into each fixed-size buffer before starting a new one
+CHUNK_ROWS = 8192
+
+# Files above this size are read via mmap so the kernel pages bytes in on
+# demand instead of going through the io stack per line
+MMAP_THRESHOLD = 100 * 1024 * 1024
+
+
+def iter_jsonl(path: Path):
+    """Yield parsed examples from a JSONL file, skipping blank lines."""
+    with open(path, "rb") as f:
+        if path.stat().st_size > MMAP_THRESHOLD:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line in iter(mm.readline, b""):
+                    if line.strip():
+                        yield _loads(line)
+            finally:
+                mm.close()
+        else:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+
+
+@functools.lru_cache(maxsize=4)
+def build_row_extractor(feature_keys: tuple):
+    """Codegen a features-dict -> tuple extractor for a fixed schema."""
+    lines = ["def _extract(f, nan=float('nan')):", "    return ("]
+    for key in feature_keys:
+        lines.append(f"        nan if (v := f.get({key!r})) is None else v,")
+    lines.append("    )")
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines), namespace)
+    return namespace["_extract"]
+
+
+def parse_jsonl_file(file_path: Path, feature_keys: List[str]) -> np.ndarray:
+    """Stream one JSONL shard straight into float32 buffers."""
+
+    n_features = len(feature_keys)
+    extract = build_row_extractor(tuple(feature_keys))
+    required = frozenset(feature_keys)
+    chunks: List[np.ndarray] = []
+    buf = np.empty((CHUNK_ROWS, n_features), dtype=np.float32)
+    row = 0
+
+    for example in iter_jsonl(file_path):
+        features = example.get("features", {})
+
+        # C-level subset test instead of a per-key Python scan
+        if not required <= features.keys():
+            continue
+
+        buf[row] = extract(features)
+        row += 1
+
+        if row == CHUNK_ROWS:
+            chunks.append(buf)
+            buf = np.empty((CHUNK_ROWS, n_features), dtype=np.float32)
+            row = 0
+
+    if row:
+        chunks.append(buf[:row])
+
+    if not chunks:
+        return np.empty((0, n_features), dtype=np.float32)
+
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+
+def load_training_data(data_path: str, feature_keys: List[str]) -> np.ndarray:
+    """Load training data as a float32 matrix, parsing shards in parallel."""
+
     data_dir = Path(data_path)
     jsonl_files = list(data_dir.glob("*.jsonl"))
-    
-    rows = []
-    
-    for file_path in jsonl_files:
-        with open(file_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                example = json.loads(line)
-                features = example.get("features", {})
-                
-                if all(key in features for key in feature_keys):
-                    row = {key: features[key] for key in feature_keys}
-                    rows.append(row)
-    
-    df = pd.DataFrame(rows)
-    X = df[feature_keys].values
-    
-    # Replace NaNs with median
+
+    # JSON parse is CPU-bound and shards share no state — fan out per file
+    if len(jsonl_files) > 1:
+        worker = functools.partial(parse_jsonl_file, feature_keys=feature_keys)
+        with ProcessPoolExecutor() as pool:
+            parts = [p for p in pool.map(worker, jsonl_files) if len(p)]
+    else:
+        parts = [p for p in (parse_jsonl_file(f, feature_keys) for f in jsonl_files) if len(p)]
+
+    if not parts:
+        raise ValueError("No valid training examples found")
+
+    X = parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    # Replace NaNs with median in one fused pass
     medians = np.nanmedian(X, axis=0)
-    for i in range(X.shape[1]):
-        X[np.isnan(X[:, i]), i] = medians[i]
-    
+    np.copyto(X, medians, where=np.isnan(X))
+
     return X
 
 
-def evaluate_cohort_engine(model_version: str, data_path: str, models_dir: str) -> None:
+def centroid_silhouette(distances: np.ndarray) -> float:
+    """Two-nearest-centroid silhouette approximation.
+
+    Uses a = distance to own centroid, b = distance to second-nearest,
+    from the centroid-distance matrix KMeans already computes — no O(N²)
+    pairwise distances needed.
+    """
+    two_nearest = np.partition(distances, 1, axis=1)[:, :2]
+    a = two_nearest[:, 0]
+    b = two_nearest[:, 1]
+    denom = np.maximum(a, b)
+    coeffs = np.divide(b - a, denom, out=np.zeros_like(denom), where=denom > 0)
+    return float(coeffs.mean())
+
+
+def evaluate_cohort_engine(model_version: str, data_path: str, models_dir: str, fast: bool = False) -> None:
     """Evaluate cohort engine and update meta."""
     
     model_dir = Path(models_dir) / model_version
@@ -115,37 +212,60 @@ def evaluate_cohort_engine(model_version: str, data_path: str, models_dir: str)
     
     # Predict labels
     labels = kmeans.predict(X_scaled)
-    
-    # Compute silhouette score
-    silhouette = silhouette_score(X_scaled, labels)
-    print(f"[Eval] Silhouette: {silhouette:.3f}")
+
+    if fast:
+        # Centroid-based approximation: same FLOPs as predict, no pairwise pass
+        silhouette = centroid_silhouette(kmeans.transform(X_scaled))
+        print(f"[Eval] Silhouette (centroid approx): {silhouette:.3f}")
+    else:
+        # Sampled — full N² distance matrix is too big past ~20k rows
+        silhouette = silhouette_score(
+            X_scaled,
+            labels,
+            metric="euclidean",
+            sample_size=min(len(X_scaled), 50000),
+            random_state=42,
+        )
+        print(f"[Eval] Silhouette: {silhouette:.3f}")
     
     # Compute stability (ARI on 50/50 split)
     if len(X) >= 100:
         X1, X2 = train_test_split(X_scaled, test_size=0.5, random_state=42)
         labels1 = kmeans.predict(X1)
         labels2 = kmeans.predict(X2)
-        
-        # Re-cluster both halves and compare
+
+        # Re-cluster both halves and compare. The refits must stay
+        # independent of the model under test or the ARI stops measuring
+        # stability, so each half gets a cold k-means++ init; a single
+        # Elkan init with capped iterations keeps most of the speedup
+        # over the old n_init=5 refits.
         from sklearn.cluster import KMeans
-        kmeans_half = KMeans(n_clusters=kmeans.n_clusters, random_state=42, n_init=5)
-        labels1_fit = kmeans_half.fit_predict(X1)
-        
-        kmeans_half2 = KMeans(n_clusters=kmeans.n_clusters, random_state=43, n_init=5)
-        labels2_fit = kmeans_half2.fit_predict(X2)
-        
+
+        def cold_refit(X_half: np.ndarray, seed: int) -> np.ndarray:
+            refit = KMeans(
+                n_clusters=kmeans.n_clusters,
+                n_init=1,
+                algorithm="elkan",
+                max_iter=100,
+                random_state=seed,
+            )
+            return refit.fit_predict(X_half)
+
+        labels1_fit = cold_refit(X1, seed=42)
+        labels2_fit = cold_refit(X2, seed=43)
+
         # Compare original model predictions to re-fit
         ari = (adjusted_rand_score(labels1, labels1_fit) + adjusted_rand_score(labels2, labels2_fit)) / 2
-        print(f"[Eval] Stability ARI: {ari:.3f}")
+        print(f"[Eval] Stability ARI (single-init refit): {ari:.3f}")
     else:
         ari = None
         print("[Eval] Not enough data for stability check (need ≥100 examples)")
     
-    # Compute outlier rate
-    unique, counts = np.unique(labels, return_counts=True)
+    # Compute outlier rate (bincount is a single O(N) pass, no sort)
+    counts = np.bincount(labels, minlength=kmeans.n_clusters)
     min_threshold = max(50, 0.02 * len(labels))
     outlier_clusters = (counts < min_threshold).sum()
-    outlier_rate = outlier_clusters / len(unique)
+    outlier_rate = outlier_clusters / kmeans.n_clusters
     min_cluster_size = int(counts.min())
     
     print(f"[Eval] Outlier rate: {outlier_rate:.2%}")
@@ -159,6 +279,7 @@ def evaluate_cohort_engine(model_version: str, data_path: str, models_dir: str)
     
     meta["silhouette_score"] = float(silhouette)
     meta["stability_ari"] = float(ari) if ari is not None else None
+    meta["stability_ari_method"] = "single_init_refit"
     meta["outlier_rate"] = float(outlier_rate)
     meta["min_cluster_size"] = min_cluster_size
     
@@ -174,10 +295,11 @@ def main():
     parser.add_argument("--model_version", required=True, help="Model version to evaluate")
     parser.add_argument("--data_path", default="./data/learning/train", help="Path to training data")
     parser.add_argument("--models_dir", default="./models/cohort_engine", help="Models directory")
-    
+    parser.add_argument("--fast", action="store_true", help="Approximate silhouette from centroid distances (skips pairwise pass)")
+
     args = parser.parse_args()
-    
-    evaluate_cohort_engine(args.model_version, args.data_path, args.models_dir)
+
+    evaluate_cohort_engine(args.model_version, args.data_path, args.models_dir, fast=args.fast)
 
 
 if __name__ == "__main__":
@@ -27,14 +27,23 @@ Outputs JSON:
 """
 
 import argparse
+import functools
 import json
 import pickle
 import sys
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+import joblib
 import numpy as np
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
 
 def load_current_schema() -> Dict[str, Any]:
     """Load current signals_v1 schema."""
@@ -50,8 +59,7 @@ def load_current_schema() -> Dict[str, Any]:
         )
         sys.exit(1)
     
-    with open(schema_path, "r") as f:
-        return json.load(f)
+    return _loads(schema_path.read_bytes())
 
 
 def load_model_meta(model_dir: str) -> Dict[str, Any]:
@@ -61,46 +69,83 @@ def load_model_meta(model_dir: str) -> Dict[str, Any]:
     if not meta_path.exists():
         raise FileNotFoundError(f"meta.json not found: {meta_path}")
     
-    with open(meta_path, "r") as f:
-        return json.load(f)
+    return _loads(meta_path.read_bytes())
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model_cached(model_path: str, mtime: float) -> Dict[str, Any]:
+    if model_path.endswith(".joblib"):
+        # mmap the centroid/scaler arrays so worker processes share pages
+        model_data = joblib.load(model_path, mmap_mode="r")
+    else:
+        with open(model_path, "rb") as f:
+            model_data = pickle.load(f)
+
+    # Pre-resolve the key -> column index map so per-call feature
+    # marshaling is a dict lookup, not a scan over feature_keys.
+    model_data["feature_index"] = {
+        key: i for i, key in enumerate(model_data["feature_keys"])
+    }
+
+    # Pre-bake the scale/predict kernel inputs: applying (x - mean) * inv_std
+    # and a matmul against the centroids inline avoids the temporary arrays
+    # sklearn's transform/predict pair allocates per call.
+    scaler = model_data["scaler"]
+    centers = np.ascontiguousarray(model_data["kmeans"].cluster_centers_, dtype=np.float32)
+    model_data["scale_mean"] = scaler.mean_.astype(np.float32)
+    model_data["scale_inv_std"] = (1.0 / scaler.scale_).astype(np.float32)
+    model_data["centers"] = centers
+    model_data["centers_sq"] = (centers ** 2).sum(axis=1)
+
+    return model_data
 
 
 def load_model(model_dir: str) -> Dict[str, Any]:
-    """Load model from directory."""
-    
-    model_path = Path(model_dir) / "model.pkl"
-    
+    """Load model from directory (cached across calls, keyed on mtime).
+
+    Prefers the joblib artifact; falls back to legacy model.pkl.
+    """
+
+    model_path = Path(model_dir) / "model.joblib"
+
+    if not model_path.exists():
+        model_path = Path(model_dir) / "model.pkl"
+
     if not model_path.exists():
         raise FileNotFoundError(f"Model not found: {model_path}")
-    
-    with open(model_path, "rb") as f:
-        model_data = pickle.load(f)
-    
-    return model_data
+
+    return _load_model_cached(str(model_path), model_path.stat().st_mtime)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_ranges_cached(ranges_path: str, mtime: float) -> Dict[int, list]:
+    ranges = _loads(Path(ranges_path).read_bytes())
+
+    # Convert string keys to int
+    return {int(k): v for k, v in ranges.items()}
 
 
 def load_ranges(model_dir: str) -> Dict[int, list]:
-    """Load ranges from ranges.json."""
-    
+    """Load ranges from ranges.json (cached across calls, keyed on mtime)."""
+
     ranges_path = Path(model_dir) / "ranges.json"
-    
+
     if not ranges_path.exists():
         raise FileNotFoundError(f"Ranges not found: {ranges_path}")
-    
-    with open(ranges_path, "r") as f:
-        ranges = json.load(f)
-    
-    # Convert string keys to int
-    return {int(k): v for k, v in ranges.items()}
 
+    return _load_ranges_cached(str(ranges_path), ranges_path.stat().st_mtime)
+
+
+def _resolve_model_dir(model_version: str, models_dir: str):
+    """Resolve a model version to its directory, validating the schema hash.
+
+    Returns (error_dict, None) on failure or (None, model_dir) on success.
+    """
 
-def infer_cohort(features: Dict[str, float], model_version: str, models_dir: str) -> Dict[str, Any]:
-    """Predict cohort for given features."""
-    
     # Load current schema
     current_schema = load_current_schema()
     current_hash = current_schema["schema_hash"]
-    
+
     # Resolve model version
     if model_version == "latest":
         latest_path = Path(models_dir) / "LATEST.json"
@@ -109,81 +154,115 @@ def infer_cohort(features: Dict[str, float], model_version: str, models_dir: str
             return {
                 "error": "no_promoted_model",
                 "message": "LATEST.json not found. No promoted model available."
-            }
-        
-        with open(latest_path, "r") as f:
-            latest = json.load(f)
-        
+            }, None
+
+        latest = _loads(latest_path.read_bytes())
+
         model_version = latest["model_version"]
-    
+
     model_dir = Path(models_dir) / model_version
-    
+
     if not model_dir.exists():
         return {
             "error": "model_not_found",
             "message": f"Model directory not found: {model_dir}"
-        }
-    
+        }, None
+
     # Load model metadata and check schema hash
     meta = load_model_meta(str(model_dir))
     model_hash = meta.get("schema_hash")
-    
+
     if model_hash != current_hash:
         return {
             "error": "schema_mismatch",
             "message": f"Model schema hash ({model_hash}) != current schema ({current_hash}). Retrain model or rollback schema.",
             "model_hash": model_hash,
             "current_hash": current_hash
-        }
-    
+        }, None
+
+    return None, model_dir
+
+
+def infer_cohorts_batch(features_list: List[Dict[str, float]], model_version: str, models_dir: str) -> List[Dict[str, Any]]:
+    """Predict cohorts for a batch of feature dicts with one model call.
+
+    Stacking inputs into a single (B, D) matrix amortizes sklearn's
+    per-call overhead, which dominates at B=1. Model-level failures
+    (missing model, schema mismatch) yield the same error dict for
+    every entry.
+    """
+
+    error, model_dir = _resolve_model_dir(model_version, models_dir)
+
+    if error is not None:
+        return [error] * len(features_list)
+
     # Load model and ranges
     model_data = load_model(str(model_dir))
     ranges = load_ranges(str(model_dir))
-    
-    kmeans = model_data["kmeans"]
-    scaler = model_data["scaler"]
+
     feature_keys = model_data["feature_keys"]
-    
-    # Extract features in correct order
-    X = []
-    for key in feature_keys:
-        value = features.get(key)
-        if value is None:
-            # Use median (0 after scaling, approximately)
-            X.append(0.0)
-        else:
-            X.append(float(value))
-    
-    X = np.array(X).reshape(1, -1)
-    
+    feature_index = model_data["feature_index"]
+
+    # Marshal features via the precomputed index map; missing/None stay 0.0
+    # (approximately the median after scaling)
+    X = np.zeros((len(features_list), len(feature_keys)), dtype=np.float32)
+    for i, features in enumerate(features_list):
+        for key, value in features.items():
+            j = feature_index.get(key)
+            if j is not None and value is not None:
+                X[i, j] = value
+
     # Replace NaNs with 0
-    X = np.nan_to_num(X, nan=0.0)
-    
-    # Scale features
-    X_scaled = scaler.transform(X)
-    
-    # Predict cohort
-    cohort_id = int(kmeans.predict(X_scaled)[0])
-    
-    # Compute distance to centroid
-    distances = kmeans.transform(X_scaled)[0]
-    distance_to_centroid = float(distances[cohort_id])
-    
-    # Compute confidence (inverse of distance, clamped)
-    confidence = max(0.0, min(1.0, 1.0 / (1.0 + distance_to_centroid)))
-    
-    # Get expected ranges for this cohort
-    expected_ranges = ranges.get(cohort_id, [])
-    
-    result = {
-        "cohort_id": cohort_id,
-        "cohort_label": f"cohort_{cohort_id}",
-        "confidence": confidence,
-        "distance_to_centroid": distance_to_centroid,
-        "expected_ranges": expected_ranges,
-    }
-    
-    return result
+    np.nan_to_num(X, nan=0.0, copy=False)
+
+    # Fused scale + distance kernel: standardize in place, then get all
+    # centroid distances from one BLAS matmul via ||x||² + ||c||² - 2x·c,
+    # instead of separate scaler.transform / kmeans.predict / transform calls
+    X_scaled = (X - model_data["scale_mean"]) * model_data["scale_inv_std"]
+    centers = model_data["centers"]
+    d2 = (
+        (X_scaled ** 2).sum(axis=1)[:, None]
+        + model_data["centers_sq"][None, :]
+        - 2.0 * (X_scaled @ centers.T)
+    )
+    np.maximum(d2, 0.0, out=d2)
+    distances = np.sqrt(d2)
+    cohort_ids = distances.argmin(axis=1)
+
+    # Two-nearest-centroid silhouette approximation: a = distance to own
+    # centroid, b = distance to second-nearest. Same FLOPs as the transform
+    # we already paid for, and usable for online cluster-quality monitoring.
+    two_nearest = np.partition(distances, 1, axis=1)[:, :2]
+
+    results = []
+
+    for i, cohort_id in enumerate(cohort_ids):
+        cohort_id = int(cohort_id)
+        distance_to_centroid = float(distances[i, cohort_id])
+
+        # Compute confidence (inverse of distance, clamped)
+        confidence = max(0.0, min(1.0, 1.0 / (1.0 + distance_to_centroid)))
+
+        a, b = two_nearest[i]
+        silhouette_approx = float((b - a) / max(a, b)) if max(a, b) > 0 else 0.0
+
+        results.append({
+            "cohort_id": cohort_id,
+            "cohort_label": f"cohort_{cohort_id}",
+            "confidence": confidence,
+            "distance_to_centroid": distance_to_centroid,
+            "silhouette_approx": silhouette_approx,
+            "expected_ranges": ranges.get(cohort_id, []),
+        })
+
+    return results
+
+
+def infer_cohort(features: Dict[str, float], model_version: str, models_dir: str) -> Dict[str, Any]:
+    """Predict cohort for given features (single-record path)."""
+
+    return infer_cohorts_batch([features], model_version, models_dir)[0]
 
 
 def main():
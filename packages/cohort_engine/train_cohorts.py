@@ -17,34 +17,45 @@ Outputs:
 """
 
 import argparse
+import functools
 import hashlib
 import json
-import pickle
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+import joblib
 import numpy as np
-import pandas as pd
-from sklearn.cluster import KMeans
+import sklearn
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score
 
+# Larger chunk budget for pairwise distance computations (silhouette)
+sklearn.set_config(working_memory=1024)
+
 
+@functools.lru_cache(maxsize=1)
 def load_signals_schema() -> Dict[str, Any]:
-    """Load canonical signals_v1 schema from JSON."""
+    """Load canonical signals_v1 schema from JSON (cached after first call)."""
     schema_path = Path("./ml/schemas/signals_v1_schema.json")
-    
+
     if not schema_path.exists():
         raise FileNotFoundError(
             f"Schema file not found: {schema_path}\n"
             "Run: node scripts/export_signals_schema.mjs"
         )
-    
-    with open(schema_path, "r") as f:
-        schema = json.load(f)
-    
-    return schema
+
+    return _loads(schema_path.read_bytes())
 
 
 # Load canonical schema
@@ -78,79 +89,210 @@ BENCHMARKABLE_METRICS = [
 ]
 
 
-def load_training_data(data_path: str) -> pd.DataFrame:
-    """Load training examples from JSONL files."""
-    
+# Rows parsed into each fixed-size buffer before starting a new one
+CHUNK_ROWS = 8192
+
+# Above this many rows, switch from full KMeans to MiniBatchKMeans
+MINIBATCH_THRESHOLD = 50000
+
+# Files above this size are read via mmap so the kernel pages bytes in on
+# demand instead of going through the io stack per line
+MMAP_THRESHOLD = 100 * 1024 * 1024
+
+# Batch size for --streaming partial_fit passes
+STREAM_BATCH_ROWS = 4096
+
+# Upper bound on rows sampled for range computation in --streaming mode
+RANGE_SAMPLE_CAP = 200000
+
+
+def iter_jsonl(path: Path):
+    """Yield parsed examples from a JSONL file, skipping blank lines."""
+    with open(path, "rb") as f:
+        if path.stat().st_size > MMAP_THRESHOLD:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line in iter(mm.readline, b""):
+                    if line.strip():
+                        yield _loads(line)
+            finally:
+                mm.close()
+        else:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+
+
+@functools.lru_cache(maxsize=4)
+def build_row_extractor(feature_keys: tuple):
+    """Codegen a features-dict -> tuple extractor for a fixed schema.
+
+    The schema is fixed at startup, so a generated function with the key
+    lookups inlined beats a generic per-key Python loop in the hot path.
+    """
+    lines = ["def _extract(f, nan=float('nan')):", "    return ("]
+    for key in feature_keys:
+        lines.append(f"        nan if (v := f.get({key!r})) is None else v,")
+    lines.append("    )")
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(lines), namespace)
+    return namespace["_extract"]
+
+
+def parse_jsonl_file(file_path: Path, feature_keys: List[str]) -> np.ndarray:
+    """Stream one JSONL shard straight into float32 buffers.
+
+    Avoids the row-dict + DataFrame round trip, which peaks at several
+    times the file size in RAM on large datasets.
+    """
+
+    n_features = len(feature_keys)
+    extract = build_row_extractor(tuple(feature_keys))
+    required = frozenset(feature_keys)
+    chunks: List[np.ndarray] = []
+    buf = np.empty((CHUNK_ROWS, n_features), dtype=np.float32)
+    row = 0
+
+    for example in iter_jsonl(file_path):
+        features = example.get("features", {})
+
+        # Only include if all required features present (C-level subset test)
+        if not required <= features.keys():
+            continue
+
+        buf[row] = extract(features)
+        row += 1
+
+        if row == CHUNK_ROWS:
+            chunks.append(buf)
+            buf = np.empty((CHUNK_ROWS, n_features), dtype=np.float32)
+            row = 0
+
+    if row:
+        chunks.append(buf[:row])
+
+    if not chunks:
+        return np.empty((0, n_features), dtype=np.float32)
+
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+
+def iter_feature_batches(jsonl_files: List[Path], feature_keys: List[str], batch_size: int = STREAM_BATCH_ROWS):
+    """Yield float32 feature batches without materializing the full matrix."""
+
+    n_features = len(feature_keys)
+    extract = build_row_extractor(tuple(feature_keys))
+    required = frozenset(feature_keys)
+    buf = np.empty((batch_size, n_features), dtype=np.float32)
+    row = 0
+
+    for file_path in jsonl_files:
+        for example in iter_jsonl(file_path):
+            features = example.get("features", {})
+
+            if not required <= features.keys():
+                continue
+
+            buf[row] = extract(features)
+            row += 1
+
+            if row == batch_size:
+                yield buf[:row]
+                row = 0
+
+    if row:
+        yield buf[:row]
+
+
+def load_feature_matrix(jsonl_files: List[Path], feature_keys: List[str]) -> np.ndarray:
+    """Parse JSONL shards into one float32 matrix, in parallel when sharded.
+
+    JSON parse is CPU-bound and the shards share no state, so a process
+    pool scales roughly linearly with core count on multi-file datasets.
+    """
+
+    if len(jsonl_files) > 1:
+        worker = functools.partial(parse_jsonl_file, feature_keys=feature_keys)
+        with ProcessPoolExecutor() as pool:
+            parts = [p for p in pool.map(worker, jsonl_files) if len(p)]
+    else:
+        parts = [p for p in (parse_jsonl_file(f, feature_keys) for f in jsonl_files) if len(p)]
+
+    if not parts:
+        return np.empty((0, len(feature_keys)), dtype=np.float32)
+
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def load_training_data(data_path: str) -> np.ndarray:
+    """Load training examples from JSONL files as a feature matrix."""
+
     data_dir = Path(data_path)
-    
+
     if not data_dir.exists():
         raise FileNotFoundError(f"Data directory not found: {data_path}")
-    
+
     jsonl_files = list(data_dir.glob("*.jsonl"))
-    
+
     if not jsonl_files:
         raise FileNotFoundError(f"No JSONL files found in {data_path}")
-    
-    rows = []
-    
-    for file_path in jsonl_files:
-        with open(file_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                example = json.loads(line)
-                
-                # Extract features
-                features = example.get("features", {})
-                
-                # Only include if all required features present
-                if all(key in features for key in FEATURE_KEYS):
-                    row = {key: features[key] for key in FEATURE_KEYS}
-                    row["example_id"] = example.get("id")
-                    rows.append(row)
-    
-    if not rows:
+
+    X = load_feature_matrix(jsonl_files, FEATURE_KEYS)
+
+    if not len(X):
         raise ValueError("No valid training examples found")
-    
-    df = pd.DataFrame(rows)
-    
-    print(f"[Train] Loaded {len(df)} examples from {len(jsonl_files)} files")
-    
-    return df
 
+    print(f"[Train] Loaded {len(X)} examples from {len(jsonl_files)} files")
+
+    return X
+
+
+def compute_ranges(
+    metrics_X: np.ndarray, metric_names: List[str], labels: np.ndarray
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Compute expected ranges per cohort for benchmarkable metrics.
+
+    Groups rows once via an argsort over labels, then uses O(N) selection
+    (np.quantile's introselect) per column instead of five separate
+    pandas reductions per (cohort, metric).
+    """
+
+    order = np.argsort(labels, kind="stable")
+    metrics_sorted = metrics_X[order]
+
+    counts = np.bincount(labels)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
 
-def compute_ranges(df: pd.DataFrame, labels: np.ndarray) -> Dict[int, List[Dict[str, Any]]]:
-    """Compute expected ranges per cohort for benchmarkable metrics."""
-    
     ranges = {}
-    
-    for cohort_id in np.unique(labels):
-        cohort_df = df[labels == cohort_id]
-        
+
+    for cohort_id in range(len(counts)):
+        if counts[cohort_id] == 0:
+            continue
+
+        cohort_rows = metrics_sorted[bounds[cohort_id]:bounds[cohort_id + 1]]
+
         cohort_ranges = []
-        
-        for metric in BENCHMARKABLE_METRICS:
-            if metric not in cohort_df.columns:
-                continue
-            
-            values = cohort_df[metric].dropna()
-            
-            if len(values) < 5:
+
+        for j, metric in enumerate(metric_names):
+            col = cohort_rows[:, j]
+            col = col[~np.isnan(col)]
+
+            if len(col) < 5:
                 continue
-            
+
+            p25, median, p75 = np.quantile(col, (0.25, 0.5, 0.75))
+
             cohort_ranges.append({
                 "metric_key": metric,
-                "min": float(values.min()),
-                "max": float(values.max()),
-                "median": float(values.median()),
-                "p25": float(values.quantile(0.25)),
-                "p75": float(values.quantile(0.75)),
+                "min": float(col.min()),
+                "max": float(col.max()),
+                "median": float(median),
+                "p25": float(p25),
+                "p75": float(p75),
             })
-        
+
         ranges[int(cohort_id)] = cohort_ranges
-    
+
     return ranges
 
 
@@ -158,33 +300,47 @@ def train_cohort_engine(data_path: str, out_dir: str, k: int = 8) -> None:
     """Train KMeans cohort engine and save outputs."""
     
     # Load data
-    df = load_training_data(data_path)
-    
-    # Extract features for clustering
-    X = df[FEATURE_KEYS].values
-    
-    # Handle NaNs (replace with median)
+    X = load_training_data(data_path)
+
+    # Keep a pre-imputation copy for range computation (NaNs must stay NaN
+    # there) — only the benchmarkable-metric columns need materializing.
+    range_metrics = [m for m in BENCHMARKABLE_METRICS if m in FEATURE_KEYS]
+    range_cols = [FEATURE_KEYS.index(m) for m in range_metrics]
+    metrics_X = X[:, range_cols].copy()
+
+    # Handle NaNs (replace with median) in one fused pass
     medians = np.nanmedian(X, axis=0)
-    for i in range(X.shape[1]):
-        X[np.isnan(X[:, i]), i] = medians[i]
+    np.copyto(X, medians, where=np.isnan(X))
     
     # Standardize features
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
-    print(f"[Train] Training KMeans with k={k}...")
-    
-    # Train KMeans
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10, max_iter=300)
+    # Full Lloyd's with n_init=10 is the dominant cost as N grows; Elkan's
+    # triangle-inequality variant matches quality at a fraction of the distance
+    # computations, and past ~50k rows mini-batch updates win outright.
+    if len(X_scaled) > MINIBATCH_THRESHOLD:
+        print(f"[Train] Training MiniBatchKMeans with k={k}...")
+        kmeans = MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=42)
+    else:
+        print(f"[Train] Training KMeans with k={k}...")
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init="auto", algorithm="elkan", max_iter=300)
+
     labels = kmeans.fit_predict(X_scaled)
     
-    # Compute silhouette score
-    silhouette = silhouette_score(X_scaled, labels)
+    # Compute silhouette score (sampled — full N² distance matrix is too big past ~20k rows)
+    silhouette = silhouette_score(
+        X_scaled,
+        labels,
+        metric="euclidean",
+        sample_size=min(len(X_scaled), 50000),
+        random_state=42,
+    )
     
     print(f"[Train] Silhouette score: {silhouette:.3f}")
     
-    # Compute cluster sizes
-    unique, counts = np.unique(labels, return_counts=True)
+    # Compute cluster sizes (bincount is a single O(N) pass, no sort)
+    counts = np.bincount(labels, minlength=k)
     min_cluster_size = int(counts.min())
     outlier_rate = (counts < max(50, 0.02 * len(labels))).sum() / k
     
@@ -192,31 +348,166 @@ def train_cohort_engine(data_path: str, out_dir: str, k: int = 8) -> None:
     print(f"[Train] Outlier rate: {outlier_rate:.2%}")
     
     # Compute expected ranges per cohort
-    ranges = compute_ranges(df, labels)
-    
+    ranges = compute_ranges(metrics_X, range_metrics, labels)
+
+    save_artifacts(
+        out_dir, k, kmeans, scaler, ranges,
+        training_rows=len(X),
+        silhouette=float(silhouette),
+        outlier_rate=float(outlier_rate),
+        min_cluster_size=min_cluster_size,
+    )
+
+
+def train_cohort_engine_streaming(data_path: str, out_dir: str, k: int = 8) -> None:
+    """Out-of-core training: constant memory regardless of dataset size.
+
+    Three streaming passes over the JSONL shards: fit the scaler with
+    partial_fit, fit MiniBatchKMeans with partial_fit, then label batches
+    to accumulate cluster counts, an approximate silhouette, and a bounded
+    row sample for range computation. NaNs are imputed with per-batch
+    medians (a global median would cost a full extra pass).
+    """
+
+    data_dir = Path(data_path)
+
+    if not data_dir.exists():
+        raise FileNotFoundError(f"Data directory not found: {data_path}")
+
+    jsonl_files = sorted(data_dir.glob("*.jsonl"))
+
+    if not jsonl_files:
+        raise FileNotFoundError(f"No JSONL files found in {data_path}")
+
+    range_metrics = [m for m in BENCHMARKABLE_METRICS if m in FEATURE_KEYS]
+    range_cols = [FEATURE_KEYS.index(m) for m in range_metrics]
+
+    def batches(with_metrics: bool = False):
+        for batch in iter_feature_batches(jsonl_files, FEATURE_KEYS):
+            # Snapshot metric columns before imputation so NaNs stay NaN
+            raw_metrics = batch[:, range_cols].copy() if with_metrics else None
+            medians = np.nanmedian(batch, axis=0)
+            np.copyto(batch, medians, where=np.isnan(batch))
+            yield batch, raw_metrics
+
+    # Pass 1: scaler statistics
+    scaler = StandardScaler()
+    n_rows = 0
+    for batch, _ in batches():
+        scaler.partial_fit(batch)
+        n_rows += len(batch)
+
+    if not n_rows:
+        raise ValueError("No valid training examples found")
+
+    print(f"[Train] Streaming pass 1/3: scaler fit on {n_rows} rows")
+
+    # Pass 2: mini-batch clustering
+    kmeans = MiniBatchKMeans(n_clusters=k, batch_size=STREAM_BATCH_ROWS, random_state=42)
+    for batch, _ in batches():
+        kmeans.partial_fit(scaler.transform(batch))
+
+    print(f"[Train] Streaming pass 2/3: MiniBatchKMeans fit (k={k})")
+
+    # Pass 3: labels, counts, approximate silhouette, bounded range sample
+    rng = np.random.default_rng(42)
+    sample_metrics = np.empty((RANGE_SAMPLE_CAP, len(range_cols)), dtype=np.float32)
+    sample_labels = np.empty(RANGE_SAMPLE_CAP, dtype=np.int64)
+    sample_n = 0
+    seen = 0
+    counts = np.zeros(k, dtype=np.int64)
+    sil_sum = 0.0
+
+    for batch, raw_metrics in batches(with_metrics=True):
+        distances = kmeans.transform(scaler.transform(batch))
+        labels = distances.argmin(axis=1)
+        counts += np.bincount(labels, minlength=k)
+
+        # Two-nearest-centroid silhouette approximation, accumulated online
+        two_nearest = np.partition(distances, 1, axis=1)[:, :2]
+        a, b = two_nearest[:, 0], two_nearest[:, 1]
+        denom = np.maximum(a, b)
+        sil_sum += np.divide(b - a, denom, out=np.zeros_like(denom), where=denom > 0).sum()
+
+        # Fill the sample buffer, then replace random slots (approximate
+        # reservoir — keeps the range sample bounded and roughly uniform)
+        take = min(RANGE_SAMPLE_CAP - sample_n, len(batch))
+        if take:
+            sample_metrics[sample_n:sample_n + take] = raw_metrics[:take]
+            sample_labels[sample_n:sample_n + take] = labels[:take]
+            sample_n += take
+        if take < len(batch):
+            rest = len(batch) - take
+            accept = rng.random(rest) < RANGE_SAMPLE_CAP / max(seen + len(batch), 1)
+            n_accept = int(accept.sum())
+            if n_accept:
+                slots = rng.integers(0, RANGE_SAMPLE_CAP, size=n_accept)
+                sample_metrics[slots] = raw_metrics[take:][accept]
+                sample_labels[slots] = labels[take:][accept]
+        seen += len(batch)
+
+    silhouette = sil_sum / n_rows
+    min_cluster_size = int(counts.min())
+    outlier_rate = (counts < max(50, 0.02 * n_rows)).sum() / k
+
+    print(f"[Train] Streaming pass 3/3: labeled {n_rows} rows")
+    print(f"[Train] Silhouette (centroid approx): {silhouette:.3f}")
+    print(f"[Train] Min cluster size: {min_cluster_size}")
+    print(f"[Train] Outlier rate: {outlier_rate:.2%}")
+
+    ranges = compute_ranges(
+        sample_metrics[:sample_n], range_metrics, sample_labels[:sample_n]
+    )
+
+    save_artifacts(
+        out_dir, k, kmeans, scaler, ranges,
+        training_rows=n_rows,
+        silhouette=float(silhouette),
+        outlier_rate=float(outlier_rate),
+        min_cluster_size=min_cluster_size,
+        extra_meta={"silhouette_method": "centroid_approx", "streaming": True},
+    )
+
+
+def save_artifacts(
+    out_dir: str,
+    k: int,
+    kmeans: Any,
+    scaler: Any,
+    ranges: Dict[int, List[Dict[str, Any]]],
+    training_rows: int,
+    silhouette: float,
+    outlier_rate: float,
+    min_cluster_size: int,
+    extra_meta: Dict[str, Any] = None,
+) -> None:
+    """Write model.joblib, ranges.json, and meta.json for a trained engine."""
+
     # Create output directory
     model_version = f"v{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
     out_path = Path(out_dir) / model_version
     out_path.mkdir(parents=True, exist_ok=True)
-    
+
     # Save model
     model_data = {
         "kmeans": kmeans,
         "scaler": scaler,
         "feature_keys": FEATURE_KEYS,
     }
-    
-    with open(out_path / "model.pkl", "wb") as f:
-        pickle.dump(model_data, f)
-    
-    print(f"[Train] Saved model to {out_path / 'model.pkl'}")
-    
+
+    # joblib stores the centroid/scaler arrays in an mmap-friendly layout
+    # (uncompressed on purpose — compression defeats mmap_mode on load),
+    # so inference workers share pages instead of copying
+    joblib.dump(model_data, out_path / "model.joblib")
+
+    print(f"[Train] Saved model to {out_path / 'model.joblib'}")
+
     # Save ranges
     with open(out_path / "ranges.json", "w") as f:
         json.dump(ranges, f, indent=2)
-    
+
     print(f"[Train] Saved ranges to {out_path / 'ranges.json'}")
-    
+
     # Save metadata
     meta = {
         "model_version": model_version,
@@ -225,16 +516,19 @@ def train_cohort_engine(data_path: str, out_dir: str, k: int = 8) -> None:
         "features_used": FEATURE_KEYS,
         "schema_version": SCHEMA["schema_version"],
         "schema_hash": SCHEMA_HASH,
-        "training_rows": len(df),
-        "silhouette_score": float(silhouette),
-        "outlier_rate": float(outlier_rate),
+        "training_rows": training_rows,
+        "silhouette_score": silhouette,
+        "outlier_rate": outlier_rate,
         "min_cluster_size": min_cluster_size,
         "promoted": False,
     }
-    
+
+    if extra_meta:
+        meta.update(extra_meta)
+
     with open(out_path / "meta.json", "w") as f:
         json.dump(meta, f, indent=2)
-    
+
     print(f"[Train] Saved metadata to {out_path / 'meta.json'}")
     print(f"[Train] ✓ Training complete: {model_version}")
 
@@ -244,10 +538,14 @@ def main():
     parser.add_argument("--data_path", default="./data/learning/train", help="Path to training data")
     parser.add_argument("--out_dir", default="./models/cohort_engine", help="Output directory")
     parser.add_argument("--k", type=int, default=8, help="Number of clusters")
-    
+    parser.add_argument("--streaming", action="store_true", help="Out-of-core training via partial_fit (constant memory)")
+
     args = parser.parse_args()
-    
-    train_cohort_engine(args.data_path, args.out_dir, args.k)
+
+    if args.streaming:
+        train_cohort_engine_streaming(args.data_path, args.out_dir, args.k)
+    else:
+        train_cohort_engine(args.data_path, args.out_dir, args.k)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,55 @@
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def load_examples(jsonl_path):
-    examples = []
-    with open(jsonl_path, "r", encoding="utf-8") as f:
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def iter_examples(jsonl_path):
+    """Yield examples one at a time so downstream passes can stream."""
+    with open(jsonl_path, "rb") as f:
         for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            examples.append(json.loads(line))
-    return examples
+            if line.strip():
+                yield _loads(line)
+
+
+def load_examples(jsonl_path):
+    return list(iter_examples(jsonl_path))
+
+
+# Example fields downstream consumers actually read; the full features
+# dict is dropped after vectorization to cut resident memory
+_META_KEYS = ("id", "source", "industry_key", "targets")
+_META_FEATURE_KEYS = ("window_rule", "mapping_confidence_level")
+
+
+def load_and_vectorize(jsonl_path):
+    """Parse, vectorize, and slim examples in one streaming pass.
+
+    Returns (meta, X): meta keeps only the fields the evaluators read,
+    X is the (N, F) feature matrix. Avoids holding every full features
+    dict plus a second vectorization pass over the loaded list.
+    """
+    import numpy as np
+    from feature_schema import vectorize_features
+
+    meta = []
+    rows = []
+    for ex in iter_examples(jsonl_path):
+        features = ex.get("features", {})
+        rows.append(vectorize_features(features))
+        slim = {key: ex[key] for key in _META_KEYS if key in ex}
+        slim["features"] = {key: features[key] for key in _META_FEATURE_KEYS if key in features}
+        meta.append(slim)
+
+    X = np.array(rows, dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+    return meta, X
 
 
 def filter_examples(examples, source=None):
     if not source:
         return examples
-    return [ex for ex in examples if ex.get("source") == source]
+    return (ex for ex in examples if ex.get("source") == source)
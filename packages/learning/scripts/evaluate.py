@@ -1,13 +1,15 @@
 import argparse
+import io
 import json
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 
 import joblib
 import numpy as np
 
-from dataset import load_examples
-from feature_schema import FEATURE_KEYS, vectorize_features
+from dataset import load_and_vectorize
+from feature_schema import FEATURE_KEYS
 
 
 def latest_model_dir(models_dir, model_name):
@@ -32,52 +34,60 @@ def previous_model_dir(models_dir, model_name, current):
     return None
 
 
-def build_feature_matrix(examples):
-    return np.array([vectorize_features(ex.get("features", {})) for ex in examples], dtype=float)
+def precision_recall_at_3(y_true, y_scores):
+    y_true = np.asarray(y_true)
+    y_scores = np.asarray(y_scores)
+    if y_true.size == 0:
+        return 0.0, 0.0
 
+    # One argpartition over the whole batch, then gather hits with fancy
+    # indexing — no per-row Python loop or set allocations
+    n_keys = y_scores.shape[1]
+    if n_keys <= 3:
+        # Every key is a "top-3" pick; a read-only broadcast view beats
+        # partitioning (or even tiling) tiny rows
+        top_idx = np.broadcast_to(np.arange(n_keys), (len(y_scores), n_keys))
+    else:
+        top_idx = np.argpartition(y_scores, -3, axis=1)[:, -3:]
 
-def precision_recall_at_3(y_true, y_scores):
-    precisions = []
-    recalls = []
-    for true_row, score_row in zip(y_true, y_scores):
-        top_k = np.argsort(score_row)[-3:]
-        true_indices = np.where(true_row == 1)[0]
-        if len(true_indices) == 0:
-            continue
-        hits = len(set(top_k) & set(true_indices))
-        precisions.append(hits / 3.0)
-        recalls.append(hits / len(true_indices))
-    if not precisions:
+    hits = np.take_along_axis(y_true.astype(bool), top_idx, axis=1).sum(axis=1)
+    true_counts = y_true.sum(axis=1)
+    mask = true_counts > 0
+    if not mask.any():
         return 0.0, 0.0
-    return float(np.mean(precisions)), float(np.mean(recalls))
+
+    precisions = hits[mask] / 3.0
+    recalls = hits[mask] / true_counts[mask]
+    return float(precisions.mean()), float(recalls.mean())
+
+
+def industry_buckets(examples):
+    """Map industry_key -> row indices in a single pass over examples."""
+    industries = np.array([ex.get("industry_key", "unknown") for ex in examples])
+    unique, inverse = np.unique(industries, return_inverse=True)
+    return {industry: np.where(inverse == k)[0] for k, industry in enumerate(unique)}
 
 
 def summarize_dataset(examples):
-    by_source = {}
-    by_industry = {}
-    by_window = {}
-    for ex in examples:
-        by_source[ex.get("source", "unknown")] = by_source.get(ex.get("source", "unknown"), 0) + 1
-        by_industry[ex.get("industry_key", "unknown")] = by_industry.get(ex.get("industry_key", "unknown"), 0) + 1
-        window_rule = ex.get("features", {}).get("window_rule", "unknown")
-        by_window[window_rule] = by_window.get(window_rule, 0) + 1
-    return by_source, by_industry, by_window
+    by_source = Counter(ex.get("source", "unknown") for ex in examples)
+    by_industry = Counter(ex.get("industry_key", "unknown") for ex in examples)
+    by_window = Counter(ex.get("features", {}).get("window_rule", "unknown") for ex in examples)
+    return dict(by_source), dict(by_industry), dict(by_window)
 
 
-def evaluate_pressure(models_dir, examples):
+def evaluate_pressure(models_dir, examples, X):
     model_dir = latest_model_dir(models_dir, "pressure_selector")
     if not model_dir:
         return None
-    model = joblib.load(model_dir / "model.pkl")
+    model = joblib.load(model_dir / "model.pkl", mmap_mode="r")
     with open(model_dir / "pressure_keys.json", "r", encoding="utf-8") as f:
         pressure_keys = json.load(f)
 
-    X = build_feature_matrix(examples)
     y = []
     for ex in examples:
         active = set(ex.get("targets", {}).get("pressure_keys", []))
         y.append([1 if key in active else 0 for key in pressure_keys])
-    y = np.array(y, dtype=int)
+    y = np.array(y, dtype=np.uint8)
 
     if hasattr(model, "predict_proba"):
         y_scores = model.predict_proba(X)
@@ -87,29 +97,30 @@ def evaluate_pressure(models_dir, examples):
     precision_at_3, recall_at_3 = precision_recall_at_3(y, y_scores)
 
     by_industry = {}
-    for industry in set(ex.get("industry_key", "unknown") for ex in examples):
-        idx = [i for i, ex in enumerate(examples) if ex.get("industry_key") == industry]
-        if not idx:
-            continue
+    for industry, idx in industry_buckets(examples).items():
         p, r = precision_recall_at_3(y[idx], y_scores[idx])
         by_industry[industry] = {"precision_at_3": p, "recall_at_3": r}
 
-    false_pos = {}
-    false_neg = {}
-    for true_row, score_row in zip(y, y_scores):
-        top_k = np.argsort(score_row)[-3:]
-        true_indices = set(np.where(true_row == 1)[0])
-        pred_indices = set(top_k)
-        for idx in pred_indices - true_indices:
-            key = pressure_keys[idx]
-            false_pos[key] = false_pos.get(key, 0) + 1
-        for idx in true_indices - pred_indices:
-            key = pressure_keys[idx]
-            false_neg[key] = false_neg.get(key, 0) + 1
+    # Confusions as boolean-mask column sums instead of per-row set algebra
+    n_keys = y_scores.shape[1]
+    if n_keys <= 3:
+        # Every key is a "top-3" pick; a read-only broadcast view beats
+        # partitioning (or even tiling) tiny rows
+        top_idx = np.broadcast_to(np.arange(n_keys), (len(y_scores), n_keys))
+    else:
+        top_idx = np.argpartition(y_scores, -3, axis=1)[:, -3:]
+    pred_mask = np.zeros(y.shape, dtype=bool)
+    np.put_along_axis(pred_mask, top_idx, True, axis=1)
+    fp_counts = (pred_mask & (y == 0)).sum(axis=0)
+    fn_counts = (~pred_mask & (y == 1)).sum(axis=0)
+
+    def top_confusions(counts):
+        order = np.argsort(counts)[::-1][:5]
+        return [(pressure_keys[i], int(counts[i])) for i in order if counts[i] > 0]
 
     confusions = {
-        "false_positives": sorted(false_pos.items(), key=lambda x: x[1], reverse=True)[:5],
-        "false_negatives": sorted(false_neg.items(), key=lambda x: x[1], reverse=True)[:5],
+        "false_positives": top_confusions(fp_counts),
+        "false_negatives": top_confusions(fn_counts),
     }
 
     prev_dir = previous_model_dir(models_dir, "pressure_selector", model_dir)
@@ -129,43 +140,35 @@ def evaluate_pressure(models_dir, examples):
     }
 
 
-def evaluate_boundary(models_dir, examples):
+def evaluate_boundary(models_dir, examples, X):
     model_dir = latest_model_dir(models_dir, "boundary_classifier")
     if not model_dir:
         return None
-    model = joblib.load(model_dir / "model.pkl")
+    model = joblib.load(model_dir / "model.pkl", mmap_mode="r")
     with open(model_dir / "class_names.json", "r", encoding="utf-8") as f:
         class_names = json.load(f)
 
-    X = build_feature_matrix(examples)
-    y_true = [ex.get("targets", {}).get("boundary_class", "unknown") for ex in examples]
+    y_true = np.array([ex.get("targets", {}).get("boundary_class", "unknown") for ex in examples])
     y_pred_idx = model.predict(X)
-    y_pred = [class_names[i] for i in y_pred_idx]
+    y_pred = np.array(class_names)[y_pred_idx]
 
-    accuracy = float(np.mean([1 if a == b else 0 for a, b in zip(y_true, y_pred)]))
+    correct = y_true == y_pred
+    accuracy = float(correct.mean())
 
     by_industry = {}
-    for industry in set(ex.get("industry_key", "unknown") for ex in examples):
-        idx = [i for i, ex in enumerate(examples) if ex.get("industry_key") == industry]
-        if not idx:
-            continue
-        acc = float(
-            np.mean([1 if y_true[i] == y_pred[i] else 0 for i in idx])
-        )
-        by_industry[industry] = {"accuracy": acc}
+    for industry, idx in industry_buckets(examples).items():
+        by_industry[industry] = {"accuracy": float(correct[idx].mean())}
 
-    confirm_total = sum(1 for label in y_true if label == "confirm_mappings")
-    false_safe = sum(1 for t, p in zip(y_true, y_pred) if t == "confirm_mappings" and p == "stable")
+    confirm = y_true == "confirm_mappings"
+    confirm_total = int(confirm.sum())
+    false_safe = int((confirm & (y_pred == "stable")).sum())
     false_safe_rate = float(false_safe / confirm_total) if confirm_total > 0 else 0.0
 
-    low_conf_total = 0
-    low_conf_mismatch = 0
-    for ex, pred in zip(examples, y_pred):
-        level = ex.get("features", {}).get("mapping_confidence_level", 0)
-        if level == 0:
-            low_conf_total += 1
-            if pred != "confirm_mappings":
-                low_conf_mismatch += 1
+    # Single dict access per example, then array math for the tallies
+    levels = np.array([ex.get("features", {}).get("mapping_confidence_level", 0) for ex in examples])
+    low_conf = levels == 0
+    low_conf_total = int(low_conf.sum())
+    low_conf_mismatch = int((low_conf & (y_pred != "confirm_mappings")).sum())
     low_conf_rate = float(low_conf_mismatch / low_conf_total) if low_conf_total > 0 else 0.0
 
     return {
@@ -177,36 +180,37 @@ def evaluate_boundary(models_dir, examples):
     }
 
 
-def evaluate_calibrator(models_dir, examples):
+def mean_benchmark_percentile(ex):
+    percentiles = [
+        m.get("percentile")
+        for m in ex.get("targets", {}).get("benchmark", [])
+        if isinstance(m.get("percentile"), (int, float))
+    ]
+    return float(np.mean(percentiles)) if percentiles else np.nan
+
+
+def evaluate_calibrator(models_dir, examples, X):
     model_dir = latest_model_dir(models_dir, "calibrator")
     if not model_dir:
         return None
-    model = joblib.load(model_dir / "model.pkl")
-    X = build_feature_matrix(examples)
-    y = []
-    sources = []
-    for ex in examples:
-        benchmarks = ex.get("targets", {}).get("benchmark", [])
-        if not benchmarks:
-            y.append(None)
-            sources.append(ex.get("source"))
-            continue
-        percentiles = [m.get("percentile") for m in benchmarks if isinstance(m.get("percentile"), (int, float))]
-        if not percentiles:
-            y.append(None)
-            sources.append(ex.get("source"))
-            continue
-        y.append(float(sum(percentiles) / len(percentiles)))
-        sources.append(ex.get("source"))
-
-    y = np.array([val if val is not None else np.nan for val in y], dtype=float)
+    model = joblib.load(model_dir / "model.pkl", mmap_mode="r")
+
+    y = np.fromiter(
+        (mean_benchmark_percentile(ex) for ex in examples),
+        dtype=np.float64,
+        count=len(examples),
+    )
+    sources = np.array([ex.get("source") for ex in examples], dtype=object)
+
     preds = model.predict(X)
+    abs_err = np.abs(preds - y)
+    has_target = ~np.isnan(y)
 
     def mae_for_source(source):
-        idx = [i for i, s in enumerate(sources) if s == source and not np.isnan(y[i])]
-        if not idx:
+        mask = (sources == source) & has_target
+        if not mask.any():
             return None
-        return float(np.mean(np.abs(preds[idx] - y[idx])))
+        return float(abs_err[mask].mean())
 
     mae_mock = mae_for_source("mock")
     mae_real = mae_for_source("real")
@@ -219,63 +223,57 @@ def evaluate_calibrator(models_dir, examples):
 
 
 def build_report(summary, output_dir):
-    lines = []
-    lines.append("# Learning Evaluation Report")
-    lines.append("")
-    lines.append("## 1) Dataset Summary")
-    lines.append(f"- Total examples: {summary['dataset_total']}")
-    lines.append(f"- By source: {summary['by_source']}")
-    lines.append(f"- By industry: {summary['by_industry']}")
-    lines.append(f"- Window distribution: {summary['by_window']}")
-    lines.append("")
-    lines.append("## 2) Pressure Selection Quality")
+    # Write into a StringIO instead of accumulating a line list; nested
+    # dicts go through json.dumps, which serializes in C and reads better
+    # in Markdown than repr output
+    buf = io.StringIO()
+    buf.write("# Learning Evaluation Report\n")
+    buf.write("\n## 1) Dataset Summary\n")
+    buf.write(f"- Total examples: {summary['dataset_total']}\n")
+    buf.write(f"- By source: {json.dumps(summary['by_source'])}\n")
+    buf.write(f"- By industry: {json.dumps(summary['by_industry'])}\n")
+    buf.write(f"- Window distribution: {json.dumps(summary['by_window'])}\n")
+    buf.write("\n## 2) Pressure Selection Quality\n")
     if summary["pressure"]:
-        lines.append(f"- Precision@3: {summary['pressure']['precision_at_3']:.3f}")
-        lines.append(f"- Recall@3: {summary['pressure']['recall_at_3']:.3f}")
-        lines.append(f"- Per-industry: {summary['pressure']['by_industry']}")
-        lines.append(f"- Top confusions: {summary['pressure']['confusions']}")
+        buf.write(f"- Precision@3: {summary['pressure']['precision_at_3']:.3f}\n")
+        buf.write(f"- Recall@3: {summary['pressure']['recall_at_3']:.3f}\n")
+        buf.write(f"- Per-industry: {json.dumps(summary['pressure']['by_industry'])}\n")
+        buf.write(f"- Top confusions: {json.dumps(summary['pressure']['confusions'])}\n")
     else:
-        lines.append("- No pressure model found")
-    lines.append("")
-    lines.append("## 3) Boundary Safety")
+        buf.write("- No pressure model found\n")
+    buf.write("\n## 3) Boundary Safety\n")
     if summary["boundary"]:
-        lines.append(f"- Accuracy: {summary['boundary']['accuracy']:.3f}")
-        lines.append(f"- Per-industry: {summary['boundary']['by_industry']}")
-        lines.append(f"- False-safe rate: {summary['boundary']['false_safe_rate']:.3f}")
-        lines.append(
-            f"- Low mapping confidence mismatch rate: {summary['boundary']['low_confidence_mismatch_rate']:.3f}"
+        buf.write(f"- Accuracy: {summary['boundary']['accuracy']:.3f}\n")
+        buf.write(f"- Per-industry: {json.dumps(summary['boundary']['by_industry'])}\n")
+        buf.write(f"- False-safe rate: {summary['boundary']['false_safe_rate']:.3f}\n")
+        buf.write(
+            f"- Low mapping confidence mismatch rate: {summary['boundary']['low_confidence_mismatch_rate']:.3f}\n"
         )
     else:
-        lines.append("- No boundary model found")
-    lines.append("")
-    lines.append("## 4) Calibration Stability")
+        buf.write("- No boundary model found\n")
+    buf.write("\n## 4) Calibration Stability\n")
     if summary["calibrator"]:
-        lines.append(f"- MAE (mock): {summary['calibrator']['mae_mock']}")
-        lines.append(f"- MAE (real): {summary['calibrator']['mae_real']}")
+        buf.write(f"- MAE (mock): {summary['calibrator']['mae_mock']}\n")
+        buf.write(f"- MAE (real): {summary['calibrator']['mae_real']}\n")
     else:
-        lines.append("- Calibrator not enabled")
-    lines.append("")
-    lines.append("## 5) Regression Gate")
-    lines.append(f"- Status: {summary['regression_status']}")
-    lines.append(f"- Details: {summary['regression_details']}")
+        buf.write("- Calibrator not enabled\n")
+    buf.write("\n## 5) Regression Gate\n")
+    buf.write(f"- Status: {summary['regression_status']}\n")
+    buf.write(f"- Details: {summary['regression_details']}")
     report_path = Path(output_dir) / "report.md"
-    report_path.write_text("\n".join(lines), encoding="utf-8")
+    report_path.write_text(buf.getvalue(), encoding="utf-8")
     return str(report_path)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Evaluate learning models")
-    parser.add_argument("--models", required=True, help="Models directory")
-    parser.add_argument("--dataset", required=True, help="Path to JSONL dataset")
-    parser.add_argument("--output", required=True, help="Output directory")
-    args = parser.parse_args()
-
-    examples = load_examples(args.dataset)
+def run_evaluation(models_dir, dataset_path, output_root):
+    # Parse, slim, and vectorize in one streaming pass; the three
+    # sub-evaluators share the same matrix
+    examples, X = load_and_vectorize(dataset_path)
     by_source, by_industry, by_window = summarize_dataset(examples)
 
-    pressure = evaluate_pressure(args.models, examples)
-    boundary = evaluate_boundary(args.models, examples)
-    calibrator = evaluate_calibrator(args.models, examples)
+    pressure = evaluate_pressure(models_dir, examples, X)
+    boundary = evaluate_boundary(models_dir, examples, X)
+    calibrator = evaluate_calibrator(models_dir, examples, X)
 
     regression_status = "PASS"
     regression_details = []
@@ -291,7 +289,7 @@ def main():
     if not regression_details:
         regression_details.append("no regression triggers")
 
-    output_dir = Path(args.output) / datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    output_dir = Path(output_root) / datetime.utcnow().strftime("%Y%m%d-%H%M%S")
     output_dir.mkdir(parents=True, exist_ok=True)
 
     summary = {
@@ -307,22 +305,30 @@ def main():
     }
 
     report_path = build_report(summary, output_dir)
+    eval_summary = {
+        "report_path": report_path,
+        "regression_status": regression_status,
+        "pressure_precision_at_3": pressure["precision_at_3"] if pressure else None,
+        "boundary_accuracy": boundary["accuracy"] if boundary else None,
+        "false_safe_rate": false_safe_rate,
+    }
     with open(output_dir / "metrics.json", "w", encoding="utf-8") as f:
         json.dump(summary, f, indent=2)
     with open(output_dir / "evaluation_summary.json", "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "report_path": report_path,
-                "regression_status": regression_status,
-                "pressure_precision_at_3": pressure["precision_at_3"] if pressure else None,
-                "boundary_accuracy": boundary["accuracy"] if boundary else None,
-                "false_safe_rate": false_safe_rate,
-            },
-            f,
-            indent=2,
-        )
+        json.dump(eval_summary, f, indent=2)
+
+    return eval_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate learning models")
+    parser.add_argument("--models", required=True, help="Models directory")
+    parser.add_argument("--dataset", required=True, help="Path to JSONL dataset")
+    parser.add_argument("--output", required=True, help="Output directory")
+    args = parser.parse_args()
 
-    print(json.dumps({"status": "ok", "report_path": report_path}))
+    eval_summary = run_evaluation(args.models, args.dataset, args.output)
+    print(json.dumps({"status": "ok", "report_path": eval_summary["report_path"]}))
 
 
 if __name__ == "__main__":
@@ -1,27 +1,14 @@
 import argparse
 import json
-import subprocess
-import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 from dataset import load_examples
-
-
-def run_script(script_path, args):
-    cmd = [sys.executable, str(script_path)] + args
-    result = subprocess.run(cmd, check=False, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(result.stderr.strip() or f"Script failed: {script_path}")
-    return result.stdout.strip()
-
-
-def parse_output(raw):
-    try:
-        lines = [line for line in raw.splitlines() if line.strip()]
-        return json.loads(lines[-1]) if lines else {}
-    except Exception:
-        return {"raw": raw}
+from evaluate import run_evaluation
+from train_boundary_classifier import train_boundary_classifier
+from train_calibrator import train_calibrator
+from train_pressure_selector import train_pressure_selector
 
 
 def main():
@@ -31,7 +18,6 @@ def main():
     parser.add_argument("--eval_out", required=True, help="Evaluation output directory")
     args = parser.parse_args()
 
-    scripts_dir = Path(__file__).parent
     models_dir = Path(args.models)
     eval_dir = Path(args.eval_out)
     models_dir.mkdir(parents=True, exist_ok=True)
@@ -43,30 +29,27 @@ def main():
 
     summary = {"trained_at": datetime.utcnow().isoformat(), "dataset": args.dataset, "models": {}}
 
-    pressure_out = run_script(scripts_dir / "train_pressure_selector.py", ["--dataset", args.dataset, "--output", args.models])
-    summary["models"]["pressure_selector"] = parse_output(pressure_out)
-
-    boundary_out = run_script(scripts_dir / "train_boundary_classifier.py", ["--dataset", args.dataset, "--output", args.models])
-    summary["models"]["boundary_classifier"] = parse_output(boundary_out)
-
-    try:
-        calibrator_out = run_script(scripts_dir / "train_calibrator.py", ["--dataset", args.dataset, "--output", args.models])
-        summary["models"]["calibrator"] = parse_output(calibrator_out)
-    except Exception as exc:
-        summary["models"]["calibrator"] = {"skipped": str(exc)}
-
-    eval_out = run_script(scripts_dir / "evaluate.py", ["--models", args.models, "--dataset", args.dataset, "--output", args.eval_out])
-    eval_summary = parse_output(eval_out)
-    report_path = eval_summary.get("report_path")
-    if report_path:
-        eval_dir = Path(report_path).parent
-        summary_path = eval_dir / "evaluation_summary.json"
-        if summary_path.exists():
-            try:
-                eval_summary = json.loads(summary_path.read_text(encoding="utf-8"))
-            except Exception:
-                pass
-    summary["evaluation"] = eval_summary
+    # The trainers run in-process and share the parsed dataset, so each fit
+    # skips interpreter startup and the sklearn import. Threads are enough
+    # for concurrency: the fits spend their time in GIL-releasing native
+    # code, and the three write to disjoint output dirs.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        pressure_future = pool.submit(train_pressure_selector, args.dataset, args.models, examples)
+        boundary_future = pool.submit(train_boundary_classifier, args.dataset, args.models, examples)
+        calibrator_future = pool.submit(train_calibrator, args.dataset, args.models, examples)
+
+        pressure_meta = pressure_future.result()
+        boundary_meta = boundary_future.result()
+        summary["models"]["pressure_selector"] = {"status": "ok", "version": pressure_meta["version"]}
+        summary["models"]["boundary_classifier"] = {"status": "ok", "version": boundary_meta["version"]}
+
+        try:
+            calibrator_meta = calibrator_future.result()
+            summary["models"]["calibrator"] = {"status": "ok", "version": calibrator_meta["version"]}
+        except Exception as exc:
+            summary["models"]["calibrator"] = {"skipped": str(exc)}
+
+    summary["evaluation"] = run_evaluation(args.models, args.dataset, args.eval_out)
 
     summary_path = models_dir / "training_summary.json"
     summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
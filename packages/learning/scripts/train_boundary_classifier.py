@@ -10,11 +10,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
 from dataset import load_examples
-from feature_schema import FEATURE_KEYS, vectorize_features
-
-
-def build_feature_matrix(examples):
-    return np.array([vectorize_features(ex.get("features", {})) for ex in examples], dtype=float)
+from feature_schema import FEATURE_KEYS, build_feature_matrix
 
 
 def build_labels(examples):
@@ -24,8 +20,9 @@ def build_labels(examples):
     return y, encoder
 
 
-def train_boundary_classifier(dataset_path, output_dir):
-    examples = load_examples(dataset_path)
+def train_boundary_classifier(dataset_path, output_dir, examples=None):
+    if examples is None:
+        examples = load_examples(dataset_path)
     if len(examples) < 10:
         raise ValueError(f"Need at least 10 examples, found {len(examples)}")
 
@@ -10,30 +10,32 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 
 from dataset import load_examples
-from feature_schema import FEATURE_KEYS, vectorize_features
+from feature_schema import FEATURE_KEYS, build_feature_matrix
 
 
-def build_feature_matrix(examples):
-    return np.array([vectorize_features(ex.get("features", {})) for ex in examples], dtype=float)
+def mean_benchmark_percentile(ex):
+    percentiles = [
+        m.get("percentile")
+        for m in ex.get("targets", {}).get("benchmark", [])
+        if isinstance(m.get("percentile"), (int, float))
+    ]
+    return float(np.mean(percentiles)) if percentiles else np.nan
 
 
 def extract_targets(examples):
-    y = []
-    filtered = []
-    for ex in examples:
-        benchmarks = ex.get("targets", {}).get("benchmark", [])
-        if not benchmarks:
-            continue
-        percentiles = [m.get("percentile") for m in benchmarks if isinstance(m.get("percentile"), (int, float))]
-        if not percentiles:
-            continue
-        y.append(float(sum(percentiles) / len(percentiles)))
-        filtered.append(ex)
-    return filtered, np.array(y, dtype=float)
-
-
-def train_calibrator(dataset_path, output_dir):
-    examples = load_examples(dataset_path)
+    y = np.fromiter(
+        (mean_benchmark_percentile(ex) for ex in examples),
+        dtype=np.float64,
+        count=len(examples),
+    )
+    mask = ~np.isnan(y)
+    filtered = [ex for ex, keep in zip(examples, mask) if keep]
+    return filtered, y[mask]
+
+
+def train_calibrator(dataset_path, output_dir, examples=None):
+    if examples is None:
+        examples = load_examples(dataset_path)
     filtered, y = extract_targets(examples)
     if len(filtered) < 10:
         raise ValueError("Not enough benchmark data to train calibrator")
@@ -10,7 +10,7 @@ from sklearn.multiclass import OneVsRestClassifier
 from sklearn.model_selection import train_test_split
 
 from dataset import load_examples
-from feature_schema import FEATURE_KEYS, vectorize_features
+from feature_schema import FEATURE_KEYS, build_feature_matrix
 
 
 def build_pressure_keys(examples):
@@ -21,13 +21,11 @@ def build_pressure_keys(examples):
     return sorted(keys)
 
 
-def build_feature_matrix(examples):
-    return np.array([vectorize_features(ex.get("features", {})) for ex in examples], dtype=float)
-
-
 def build_label_matrix(examples, pressure_keys):
     key_index = {k: i for i, k in enumerate(pressure_keys)}
-    y = np.zeros((len(examples), len(pressure_keys)), dtype=int)
+    # 0/1 labels: uint8 is an eighth of int64's memory traffic and sklearn
+    # casts internally where it needs wider types
+    y = np.zeros((len(examples), len(pressure_keys)), dtype=np.uint8)
     for row_idx, ex in enumerate(examples):
         for key in ex.get("targets", {}).get("pressure_keys", []):
             if key in key_index:
@@ -36,23 +34,35 @@ def build_label_matrix(examples, pressure_keys):
 
 
 def precision_recall_at_3(y_true, y_scores):
-    precisions = []
-    recalls = []
-    for true_row, score_row in zip(y_true, y_scores):
-        top_k = np.argsort(score_row)[-3:]
-        true_indices = np.where(true_row == 1)[0]
-        if len(true_indices) == 0:
-            continue
-        hits = len(set(top_k) & set(true_indices))
-        precisions.append(hits / 3.0)
-        recalls.append(hits / len(true_indices))
-    if not precisions:
+    y_true = np.asarray(y_true)
+    y_scores = np.asarray(y_scores)
+    if y_true.size == 0:
         return 0.0, 0.0
-    return float(np.mean(precisions)), float(np.mean(recalls))
+
+    # One argpartition over the whole batch, then gather hits with fancy
+    # indexing — no per-row Python loop or set allocations
+    n_keys = y_scores.shape[1]
+    if n_keys <= 3:
+        # Every key is a "top-3" pick; a read-only broadcast view beats
+        # partitioning (or even tiling) tiny rows
+        top_idx = np.broadcast_to(np.arange(n_keys), (len(y_scores), n_keys))
+    else:
+        top_idx = np.argpartition(y_scores, -3, axis=1)[:, -3:]
+
+    hits = np.take_along_axis(y_true.astype(bool), top_idx, axis=1).sum(axis=1)
+    true_counts = y_true.sum(axis=1)
+    mask = true_counts > 0
+    if not mask.any():
+        return 0.0, 0.0
+
+    precisions = hits[mask] / 3.0
+    recalls = hits[mask] / true_counts[mask]
+    return float(precisions.mean()), float(recalls.mean())
 
 
-def train_pressure_selector(dataset_path, output_dir):
-    examples = load_examples(dataset_path)
+def train_pressure_selector(dataset_path, output_dir, examples=None):
+    if examples is None:
+        examples = load_examples(dataset_path)
     if len(examples) < 10:
         raise ValueError(f"Need at least 10 examples, found {len(examples)}")
 
@@ -65,8 +75,10 @@ def train_pressure_selector(dataset_path, output_dir):
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    base = LogisticRegression(max_iter=1000)
-    model = OneVsRestClassifier(base)
+    # liblinear's coordinate descent beats lbfgs on binary problems this
+    # size, and n_jobs=-1 fits the K one-vs-rest classifiers in parallel
+    base = LogisticRegression(max_iter=1000, solver="liblinear")
+    model = OneVsRestClassifier(base, n_jobs=-1)
     model.fit(X_train, y_train)
 
     if hasattr(model, "predict_proba"):
@@ -1,13 +1,22 @@
 import argparse
+import hashlib
 import json
+import math
 import os
-from dataclasses import dataclass
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from datasets import load_dataset
 except Exception as e:
@@ -16,6 +25,21 @@ except Exception as e:
 
 MONEY_BUCKETS = ["micro", "small", "medium", "large", "jumbo"]
 
+# Preferred amount column names, in priority order
+AMOUNT_CANDIDATES = ["amount", "amt", "total", "value", "transaction_amount", "payment_amount", "price"]
+
+
+def dump_json_atomic(obj: Dict[str, Any], out_path: str) -> None:
+    """Serialize with orjson when available and swap in via atomic rename."""
+    if orjson is not None:
+        payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        payload = (json.dumps(obj, indent=2) + "\n").encode("utf-8")
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, out_path)
+
 
 def bucket_money(amount: float) -> str:
     value = float(abs(amount)) if np.isfinite(amount) else 0.0
@@ -52,25 +76,71 @@ def top_shares(amounts: np.ndarray) -> Tuple[float, float]:
 
 
 def find_amount_column(df: pd.DataFrame) -> Optional[str]:
-    candidates = ["amount", "amt", "total", "value", "transaction_amount", "payment_amount", "price"]
     lower = {c.lower(): c for c in df.columns}
-    for cand in candidates:
+    for cand in AMOUNT_CANDIDATES:
         if cand in lower:
             return lower[cand]
-    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-    if numeric_cols:
+    # One select_dtypes call instead of a per-column is_numeric_dtype check
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols):
         return numeric_cols[0]
     return None
 
 
-def sample_dataset_rows(name: str, split: str, max_rows: int, cache_dir: str) -> pd.DataFrame:
-    ds = load_dataset(name, split=split, cache_dir=cache_dir)
+def load_cached_dataset(name: str, split: str, cache_dir: str):
+    """Load a split cache-first: reuse on-disk data and skip checksum passes.
+
+    Re-runs (CI, local iteration) never touch the network once the cache
+    is warm.
+    """
+    return load_dataset(
+        name,
+        split=split,
+        cache_dir=cache_dir,
+        download_mode="reuse_dataset_if_exists",
+        verification_mode="no_checks",
+    )
+
+
+def find_amount_feature(ds) -> Optional[str]:
+    """Pick the amount column from Arrow metadata, before any pandas conversion."""
+    lower = {c.lower(): c for c in ds.column_names}
+    for cand in AMOUNT_CANDIDATES:
+        if cand in lower:
+            return lower[cand]
+    for col in ds.column_names:
+        dtype = getattr(ds.features[col], "dtype", "")
+        if dtype.startswith(("int", "uint", "float")):
+            return col
+    return None
+
+
+def sample_dataset_rows(name: str, split: str, max_rows: int, cache_dir: str) -> Tuple[pd.DataFrame, str]:
+    """Return sampled rows plus the dataset fingerprint for cache keying."""
+    ds = load_cached_dataset(name, split, cache_dir)
+    fingerprint = str(getattr(ds, "_fingerprint", ""))
     n = min(max_rows, len(ds))
     if n <= 0:
-        return pd.DataFrame()
+        return pd.DataFrame(), fingerprint
+    # Project down to the one column we read before materializing pandas;
+    # wide payment schemas otherwise drag every string column through the
+    # Arrow->pandas conversion
+    col = find_amount_feature(ds)
+    if col is not None:
+        ds = ds.select_columns([col])
     rng = np.random.default_rng(1337)
     idx = rng.choice(len(ds), size=n, replace=False)
-    return ds.select(idx).to_pandas()
+    return ds.select(idx).to_pandas(), fingerprint
+
+
+# Bump to invalidate previously written stats sidecars
+STATS_CACHE_VERSION = 1
+
+
+def stats_cache_path(cache_dir: str, name: str, split: str, max_rows: int, fingerprint: str) -> str:
+    key = f"v{STATS_CACHE_VERSION}:{name}:{split}:{max_rows}:{fingerprint}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, "stats", f"{digest}.json")
 
 
 @dataclass
@@ -96,28 +166,29 @@ def estimate_job_value_delta_threshold(amounts: np.ndarray) -> float:
     rng = np.random.default_rng(2026)
     sample_size = int(min(600, max(150, cleaned.size)))
     reps = 160
-    bucket_shares = []
-
-    for _ in range(reps):
-        sample = rng.choice(cleaned, size=sample_size, replace=True)
-        buckets = np.array([bucket_money(x) for x in sample])
-        shares = []
-        for b in MONEY_BUCKETS:
-            shares.append(float(np.mean(buckets == b)))
-        bucket_shares.append(shares)
-
-    mat = np.array(bucket_shares)
-    std_by_bucket = np.std(mat, axis=0)
+
+    # Draw every bootstrap replicate at once and bucket with np.digitize;
+    # the edges mirror bucket_money's thresholds so codes 0..4 line up with
+    # MONEY_BUCKETS order
+    # integers + gather is the fast bootstrap idiom; choice validates and
+    # copies through its slower generic path
+    samples = cleaned[rng.integers(0, cleaned.size, size=(reps, sample_size))]
+    edges = np.array([250.0, 750.0, 2500.0, 7500.0])
+    codes = np.digitize(samples, edges)
+    shares = (codes[..., None] == np.arange(len(MONEY_BUCKETS))).mean(axis=1)
+    std_by_bucket = np.std(shares, axis=0)
     avg_std = float(np.mean(std_by_bucket))
     proposed = max(0.10, min(0.18, 2.0 * avg_std))
     return float(proposed)
 
 
 def median(values: List[float]) -> float:
-    vals = [v for v in values if np.isfinite(v)]
+    # math.isfinite beats a per-scalar NumPy dispatch on the short lists
+    # this aggregates (a handful of per-dataset medians)
+    vals = [v for v in values if math.isfinite(v)]
     if not vals:
         return 0.0
-    return float(np.median(np.array(vals)))
+    return float(statistics.median(vals))
 
 
 def main() -> None:
@@ -138,12 +209,39 @@ def main() -> None:
     amount_stats: List[AmountStats] = []
     notes: List[str] = []
 
+    # The downloads are independent and network-bound, so fetch them
+    # concurrently; results are consumed in list order to keep notes and
+    # stats deterministic
+    with ThreadPoolExecutor(max_workers=len(datasets_to_try)) as pool:
+        fetches = {
+            (name, split): pool.submit(sample_dataset_rows, name, split, args.max_rows, cache_dir)
+            for name, split in datasets_to_try
+        }
+        samples = {}
+        for key, future in fetches.items():
+            try:
+                samples[key] = future.result()
+            except Exception as e:
+                samples[key] = e
+
     for name, split in datasets_to_try:
-        try:
-            df = sample_dataset_rows(name, split, args.max_rows, cache_dir)
-        except Exception as e:
-            notes.append(f"Skipped {name}: download/load failed ({type(e).__name__}).")
+        result = samples[(name, split)]
+        if isinstance(result, Exception):
+            notes.append(f"Skipped {name}: download/load failed ({type(result).__name__}).")
             continue
+        df, fingerprint = result
+
+        # Warm-run shortcut: reuse the stats sidecar when the dataset
+        # fingerprint and sampling parameters are unchanged
+        stats_path = stats_cache_path(cache_dir, name, split, args.max_rows, fingerprint)
+        if os.path.exists(stats_path):
+            try:
+                with open(stats_path, "r", encoding="utf-8") as f:
+                    amount_stats.append(AmountStats(**json.load(f)))
+                notes.append(f"Reused cached amount stats for {name}.")
+                continue
+            except Exception:
+                pass  # stale or corrupt sidecar; recompute below
 
         if df.empty:
             notes.append(f"Skipped {name}: empty dataset split.")
@@ -154,50 +252,63 @@ def main() -> None:
             notes.append(f"Skipped {name}: no usable numeric amount column found.")
             continue
 
-        series = pd.to_numeric(df[col], errors="coerce").astype(float)
-        amounts = series.to_numpy()
-        amounts = amounts[np.isfinite(amounts)]
-        if amounts.size == 0:
+        # One temporary and one boolean index instead of filtering the
+        # array three separate times
+        raw = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, copy=False)
+        if not np.isfinite(raw).any():
             notes.append(f"Skipped {name}: amount column had no numeric rows after coercion.")
             continue
 
-        amounts = np.abs(amounts)
-        amounts = amounts[amounts > 0]
+        magnitudes = np.abs(raw)
+        amounts = magnitudes[np.isfinite(magnitudes) & (magnitudes > 0)]
         if amounts.size == 0:
             notes.append(f"Skipped {name}: amounts were all zero/empty after cleaning.")
             continue
 
-        # Concentration behavior across multiple random batches ("jobs")
+        # Concentration behavior across multiple random batches ("jobs"):
+        # draw all batches as one matrix and sort each row once instead of
+        # 100 separate choice/sort round-trips
         rng = np.random.default_rng(2026)
-        batch_shares_top10: List[float] = []
-        batch_shares_top25: List[float] = []
-        for _ in range(100):
-            batch = rng.choice(amounts, size=min(250, amounts.size), replace=True)
-            s10, s25 = top_shares(batch)
-            batch_shares_top10.append(s10)
-            batch_shares_top25.append(s25)
+        reps = 100
+        batch_size = min(250, amounts.size)
+        batches = amounts[rng.integers(0, amounts.size, size=(reps, batch_size))]
+        sorted_batches = np.sort(batches, axis=1)[:, ::-1]
+        totals = sorted_batches.sum(axis=1)
+        k10 = int(np.ceil(batch_size * 0.10))
+        k25 = int(np.ceil(batch_size * 0.25))
+        batch_shares_top10 = sorted_batches[:, :k10].sum(axis=1) / totals
+        batch_shares_top25 = sorted_batches[:, :k25].sum(axis=1) / totals
 
         delta = estimate_job_value_delta_threshold(amounts)
 
-        amount_stats.append(
-            AmountStats(
-                name=name,
-                row_count=int(amounts.size),
-                amount_col=col,
-                p50=pct(amounts, 50),
-                p90=pct(amounts, 90),
-                p95=pct(amounts, 95),
-                p99=pct(amounts, 99),
-                median_top10=median(batch_shares_top10),
-                median_top25=median(batch_shares_top25),
-                job_value_delta_threshold=delta,
-            )
+        # One percentile call sorts once for all four quantiles
+        p50, p90, p95, p99 = np.percentile(amounts, [50, 90, 95, 99])
+
+        stats = AmountStats(
+            name=name,
+            row_count=int(amounts.size),
+            amount_col=col,
+            p50=float(p50),
+            p90=float(p90),
+            p95=float(p95),
+            p99=float(p99),
+            median_top10=median(batch_shares_top10),
+            median_top25=median(batch_shares_top25),
+            job_value_delta_threshold=delta,
         )
+        amount_stats.append(stats)
+
+        os.makedirs(os.path.dirname(stats_path), exist_ok=True)
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(stats), f, indent=2)
 
-    # Optional: lightweight anomaly dataset touch (no training; just sanity that we can load/slice)
+    # Optional: lightweight anomaly dataset touch (no training; just sanity
+    # that we can load/slice). Streaming pulls one row instead of
+    # downloading the whole split on cold caches.
     try:
-        _ = load_dataset("keras-io/timeseries-anomaly-detection", split="train", cache_dir=cache_dir)
-        notes.append("Loaded keras-io/timeseries-anomaly-detection (small slice) for offline anomaly sanity checks.")
+        anomaly_ds = load_dataset("keras-io/timeseries-anomaly-detection", split="train", streaming=True)
+        next(iter(anomaly_ds))
+        notes.append("Streamed one row of keras-io/timeseries-anomaly-detection for offline anomaly sanity checks.")
     except Exception as e:
         notes.append(f"Skipped keras-io/timeseries-anomaly-detection: load failed ({type(e).__name__}).")
 
@@ -255,9 +366,7 @@ def main() -> None:
 
     out_path = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-        f.write("\n")
+    dump_json_atomic(out, out_path)
 
     print(f"Wrote calibration defaults: {out_path}")
 
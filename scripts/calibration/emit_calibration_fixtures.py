@@ -3,6 +3,23 @@ import json
 import os
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dump_json_atomic(obj, out_path: str) -> None:
+    """Serialize with orjson when available and swap in via atomic rename."""
+    if orjson is not None:
+        payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    else:
+        payload = (json.dumps(obj, indent=2) + "\n").encode("utf-8")
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, out_path)
+
 
 def main() -> None:
     parser = argparse.ArgumentParser()
@@ -48,9 +65,7 @@ def main() -> None:
     }
 
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(envelope, f, indent=2)
-        f.write("\n")
+    dump_json_atomic(envelope, out_path)
 
     print(f"Wrote suggested envelope: {out_path}")
 
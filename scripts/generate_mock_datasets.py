@@ -3,12 +3,14 @@ Generate multiple mock HVAC business datasets for testing
 Creates varied scenarios: growing business, seasonal heavy, steady operations, etc.
 """
 import csv
-import random
+import io
 import datetime
 import zipfile
 import os
 from pathlib import Path
 
+import numpy as np
+
 # Configuration
 YEAR = 2025
 START_DATE = datetime.date(YEAR, 1, 1)
@@ -47,6 +49,15 @@ JOB_TYPES = {
     "Air Quality Install": ["UVC Air Scrubber"]
 }
 
+# Structure-of-arrays view of MATERIALS: integer part indexes instead of
+# dict lookups by name in the invoice loop
+PART_NAMES = list(MATERIALS)
+PART_INDEX = {name: i for i, name in enumerate(PART_NAMES)}
+PART_COST = np.array([MATERIALS[p][0] for p in PART_NAMES])
+PART_PRICE = np.array([MATERIALS[p][1] for p in PART_NAMES])
+JOB_TYPE_PART_IDX = {jt: np.array([PART_INDEX[p] for p in parts]) for jt, parts in JOB_TYPES.items()}
+REFRIGERANT_IDX = PART_INDEX["R-410A Refrigerant (lb)"]
+
 # Seasonal Weights (Month 1-12)
 SEASONAL_MULTIPLIER = {
     1: 0.8, 2: 0.7, 3: 0.9, 4: 1.2, 5: 1.8, 6: 2.5, 
@@ -58,15 +69,15 @@ FIRST_NAMES = ["John", "Jane", "Robert", "Emily", "Michael", "Sarah", "David", "
                "William", "Patricia", "Richard", "Linda", "Joseph", "Barbara", "Thomas", "Elizabeth", "Charles", "Mary"]
 LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
               "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin"]
+STREET_NAMES = ["Broadway", "Main", "Apache", "Southern", "University"]
 
-def random_phone():
-    return f"(480) {random.randint(200,999)}-{random.randint(1000,9999)}"
-
-def write_csv(filename, headers, data):
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(data)
+def zip_csv(zipf, filename, headers, data):
+    """Serialize rows to CSV in memory and stream them into the open zip."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    writer.writerows(data)
+    zipf.writestr(filename, buf.getvalue())
 
 def generate_dataset(scenario_name, volume_multiplier=1.0, close_rate=0.8, payment_delay_avg=30, seasonal_variation=1.0):
     """
@@ -81,154 +92,180 @@ def generate_dataset(scenario_name, volume_multiplier=1.0, close_rate=0.8, payme
     """
     print(f"Generating {scenario_name}...")
     
-    # Data Storage
-    customers = []
-    quotes = []
-    jobs = []
-    schedule = []
-    invoices = []
-    invoice_items = []
-    
+    # Stream rows straight into per-table CSV buffers as they are
+    # produced; only counters survive the loop instead of six giant
+    # lists of row lists
+    table_headers = {
+        "customers": ["CustomerID", "Name", "Address", "Phone", "Email"],
+        "quotes": ["QuoteID", "CustomerID", "Date", "Description", "Status"],
+        "jobs": ["JobID", "QuoteID", "CustomerID", "JobType", "Status"],
+        "schedule": ["JobID", "Technician", "StartTime", "EndTime"],
+        "invoices": ["InvoiceID", "JobID", "Date", "DueDate", "Subtotal", "Tax", "Total", "EstProfit", "Status"],
+        "invoice_items": ["InvoiceID", "Item", "Quantity", "UnitPrice", "LineTotal"],
+    }
+    buffers = {t: io.StringIO() for t in table_headers}
+    writers = {t: csv.writer(buffers[t]) for t in table_headers}
+    for t, headers in table_headers.items():
+        writers[t].writerow(headers)
+
+    customer_count = 0
+    job_count = 0
+    invoice_count = 0
+
     customer_id_counter = 1000
     quote_id_counter = 5000
     job_id_counter = 8000
     invoice_id_counter = 20000
-    
-    current_date = START_DATE
-    while current_date <= END_DATE:
-        month = current_date.month
-        day_of_week = current_date.weekday() # 0=Mon, 6=Sun
-        
-        # Base jobs per day (random fluctuation)
-        daily_volume = random.randint(2, 6)
-        
-        # Apply volume multiplier and seasonality
-        seasonal_factor = 1.0 + (SEASONAL_MULTIPLIER[month] - 1.0) * seasonal_variation
-        daily_volume = int(daily_volume * volume_multiplier * seasonal_factor)
-        
-        # Reduce volume on weekends
-        if day_of_week == 5: # Saturday
-            daily_volume = int(daily_volume * 0.5)
-        elif day_of_week == 6: # Sunday
-            daily_volume = 0
-            if random.random() > 0.95: daily_volume = 1
+
+    rng = np.random.default_rng()
+
+    # Compute the whole year's daily volumes in one vectorized pass:
+    # base draw, seasonality, weekend damping — then flatten to one
+    # date per job with np.repeat instead of a nested day/job loop
+    dates = np.array([START_DATE + datetime.timedelta(days=i) for i in range((END_DATE - START_DATE).days + 1)])
+    months = np.array([d.month for d in dates])
+    weekdays = np.array([d.weekday() for d in dates])  # 0=Mon, 6=Sun
+
+    base = rng.integers(2, 7, size=dates.size)
+    seasonal = 1.0 + (np.array([SEASONAL_MULTIPLIER[m] for m in months]) - 1.0) * seasonal_variation
+    daily_volume = (base * volume_multiplier * seasonal).astype(int)
+
+    saturday = weekdays == 5
+    daily_volume[saturday] = (daily_volume[saturday] * 0.5).astype(int)
+    sunday = weekdays == 6
+    daily_volume[sunday] = (rng.random(int(sunday.sum())) > 0.95).astype(int)
+
+    job_dates = np.repeat(dates, daily_volume)
+    job_months = np.repeat(months, daily_volume)
+    total_jobs = job_dates.size
+
+    # Draw every per-job random field up front in batched Generator calls;
+    # the loop below only indexes into these arrays
+    fname_idx = rng.integers(0, len(FIRST_NAMES), size=total_jobs)
+    lname_idx = rng.integers(0, len(LAST_NAMES), size=total_jobs)
+    addr_num = rng.integers(100, 10000, size=total_jobs)
+    street_idx = rng.integers(0, len(STREET_NAMES), size=total_jobs)
+    area_idx = rng.integers(0, len(SERVICE_AREAS), size=total_jobs)
+    phone_mid = rng.integers(200, 1000, size=total_jobs)
+    phone_tail = rng.integers(1000, 10000, size=total_jobs)
+    accepted = rng.random(total_jobs) < close_rate
+    tech_idx = rng.integers(0, len(TECHNICIANS), size=total_jobs)
+    sched_offsets = rng.integers(1, 8, size=total_jobs)
+    start_hours = rng.integers(7, 17, size=total_jobs)
+    durations = rng.integers(1, 5, size=total_jobs)
+    parts_u = rng.random(total_jobs)
+    refrigerant_qty = rng.integers(1, 6, size=total_jobs)
+    payment_delays = np.maximum(
+        0, rng.normal(payment_delay_avg, payment_delay_avg * 0.3, size=total_jobs).astype(int)
+    )
+
+    # Seasonal job-type mix, drawn per season bucket via searchsorted on
+    # cumulative weights instead of random.choices per job
+    j_types = np.empty(total_jobs, dtype=object)
+    type_u = rng.random(total_jobs)
+    summer = np.isin(job_months, [5, 6, 7, 8, 9])
+    winter = np.isin(job_months, [11, 12, 1, 2])
+    shoulder = ~(summer | winter)
+    for mask, types, weights in (
+        (summer, ["AC Repair", "AC Installation", "Maintenance/Tune-up"], [60, 10, 30]),
+        (winter, ["Heating Repair", "Heat Pump Install", "Maintenance/Tune-up"], [50, 15, 35]),
+        (shoulder, ["Maintenance/Tune-up", "Air Quality Install", "AC Installation"], [60, 10, 30]),
+    ):
+        cum = np.cumsum(weights) / np.sum(weights)
+        j_types[mask] = np.array(types, dtype=object)[np.searchsorted(cum, type_u[mask], side="right")]
+
+    for i in range(total_jobs):
+        current_date = job_dates[i]
+        # 1. Create Customer
+        c_id = customer_id_counter
+        c_fname = FIRST_NAMES[fname_idx[i]]
+        c_lname = LAST_NAMES[lname_idx[i]]
+        c_name = f"{c_fname} {c_lname}"
+        c_addr = f"{addr_num[i]} E {STREET_NAMES[street_idx[i]]} Trl, {SERVICE_AREAS[area_idx[i]]}"
+        c_phone = f"(480) {phone_mid[i]}-{phone_tail[i]}"
+        writers["customers"].writerow([c_id, c_name, c_addr, c_phone, f"{c_fname.lower()}.{c_lname.lower()}@example.com"])
+        customer_count += 1
+        customer_id_counter += 1
+
+        # 2. Job type was drawn above from the seasonal mix
+        j_type = j_types[i]
+
+        # 3. Create Quote
+        q_id = quote_id_counter
+        q_status = "Accepted" if accepted[i] else "Rejected"
+        writers["quotes"].writerow([q_id, c_id, current_date, f"Quote for {j_type}", q_status])
+        quote_id_counter += 1
+
+        if q_status == "Accepted":
+            # 4. Create Job
+            j_id = job_id_counter
+            tech = TECHNICIANS[tech_idx[i]]
+            job_status = "Completed"
+            writers["jobs"].writerow([j_id, q_id, c_id, j_type, job_status])
+            job_count += 1
+
+            # 5. Schedule (1-7 days after quote)
+            job_date = current_date + datetime.timedelta(days=int(sched_offsets[i]))
+            start_hour = int(start_hours[i])
+            duration = int(durations[i])
+            start_time = f"{job_date} {start_hour:02d}:00:00"
+            end_time = f"{job_date} {start_hour+duration:02d}:00:00"
+            writers["schedule"].writerow([j_id, tech, start_time, end_time])
+
+            # 6. Invoice & Items
+            inv_id = invoice_id_counter
+            
+            # Calculate costs
+            labor_hours = duration
+            labor_cost = labor_hours * LABOR_RATE
+            
+            # Add materials: gather prices/costs by part index and do the
+            # line math as one array expression
+            part_pool = JOB_TYPE_PART_IDX[j_type]
+            num_parts = 1 + int(parts_u[i] * min(3, part_pool.size))
+            selected = part_pool[rng.permutation(part_pool.size)[:num_parts]]
+
+            qtys = np.where(selected == REFRIGERANT_IDX, refrigerant_qty[i], 1)
+            line_totals = PART_PRICE[selected] * qtys
+            mat_total = float(line_totals.sum())
+            job_cost = float((PART_COST[selected] * qtys).sum())
+
+            # Add Labor Line Item
+            writers["invoice_items"].writerow([inv_id, "Labor", labor_hours, LABOR_RATE, labor_cost])
+
+            for part_idx, qty, line_total in zip(selected, qtys, line_totals):
+                writers["invoice_items"].writerow(
+                    [inv_id, PART_NAMES[part_idx], int(qty), float(PART_PRICE[part_idx]), float(line_total)]
+                )
+
+            subtotal = labor_cost + mat_total
+            tax = round(subtotal * 0.081, 2) # ~8.1% AZ Tax
+            total = subtotal + tax
+            profit = (subtotal - (labor_hours * 40) - job_cost) # Assuming $40/hr tech wage cost
+
+            # Payment timing varies by scenario
+            payment_date = job_date + datetime.timedelta(days=int(payment_delays[i]))
+            payment_status = "Paid" if payment_date <= datetime.date(2025, 12, 31) else "Unpaid"
             
-        for _ in range(daily_volume):
-            # 1. Create Customer
-            c_id = customer_id_counter
-            c_fname = random.choice(FIRST_NAMES)
-            c_lname = random.choice(LAST_NAMES)
-            c_name = f"{c_fname} {c_lname}"
-            c_addr = f"{random.randint(100, 9999)} E {random.choice(['Broadway', 'Main', 'Apache', 'Southern', 'University'])} Trl, {random.choice(SERVICE_AREAS)}"
-            customers.append([c_id, c_name, c_addr, random_phone(), f"{c_fname.lower()}.{c_lname.lower()}@example.com"])
-            customer_id_counter += 1
-
-            # 2. Determine Job Type based on Season
-            if month in [5, 6, 7, 8, 9]:
-                j_type = random.choices(["AC Repair", "AC Installation", "Maintenance/Tune-up"], weights=[60, 10, 30])[0]
-            elif month in [11, 12, 1, 2]:
-                j_type = random.choices(["Heating Repair", "Heat Pump Install", "Maintenance/Tune-up"], weights=[50, 15, 35])[0]
-            else:
-                j_type = random.choices(["Maintenance/Tune-up", "Air Quality Install", "AC Installation"], weights=[60, 10, 30])[0]
-
-            # 3. Create Quote
-            q_id = quote_id_counter
-            q_status = "Accepted" if random.random() < close_rate else "Rejected"
-            quotes.append([q_id, c_id, current_date, f"Quote for {j_type}", q_status])
-            quote_id_counter += 1
-
-            if q_status == "Accepted":
-                # 4. Create Job
-                j_id = job_id_counter
-                tech = random.choice(TECHNICIANS)
-                job_status = "Completed"
-                jobs.append([j_id, q_id, c_id, j_type, job_status])
-                
-                # 5. Schedule (1-7 days after quote)
-                job_date = current_date + datetime.timedelta(days=random.randint(1, 7))
-                start_hour = random.randint(7, 16)
-                duration = random.randint(1, 4)
-                start_time = f"{job_date} {start_hour:02d}:00:00"
-                end_time = f"{job_date} {start_hour+duration:02d}:00:00"
-                schedule.append([j_id, tech, start_time, end_time])
-
-                # 6. Invoice & Items
-                inv_id = invoice_id_counter
-                
-                # Calculate costs
-                labor_hours = duration
-                labor_cost = labor_hours * LABOR_RATE
-                
-                # Add materials
-                mat_total = 0
-                job_cost = 0
-                possible_parts = JOB_TYPES[j_type]
-                num_parts = random.randint(1, min(3, len(possible_parts)))
-                
-                selected_parts = random.sample(possible_parts, num_parts)
-                
-                # Add Labor Line Item
-                invoice_items.append([inv_id, "Labor", labor_hours, LABOR_RATE, labor_cost])
-                
-                for part in selected_parts:
-                    cost, price = MATERIALS[part]
-                    qty = 1
-                    if part == "R-410A Refrigerant (lb)":
-                        qty = random.randint(1, 5)
-                    
-                    line_total = price * qty
-                    mat_total += line_total
-                    job_cost += (cost * qty)
-                    
-                    invoice_items.append([inv_id, part, qty, price, line_total])
-
-                subtotal = labor_cost + mat_total
-                tax = round(subtotal * 0.081, 2) # ~8.1% AZ Tax
-                total = subtotal + tax
-                profit = (subtotal - (labor_hours * 40) - job_cost) # Assuming $40/hr tech wage cost
-
-                # Payment timing varies by scenario
-                payment_delay = max(0, int(random.gauss(payment_delay_avg, payment_delay_avg * 0.3)))
-                payment_date = job_date + datetime.timedelta(days=payment_delay)
-                payment_status = "Paid" if payment_date <= datetime.date(2025, 12, 31) else "Unpaid"
-                
-                invoices.append([inv_id, j_id, job_date, job_date + datetime.timedelta(days=30), subtotal, tax, total, profit, payment_status])
-                
-                job_id_counter += 1
-                invoice_id_counter += 1
-
-        current_date += datetime.timedelta(days=1)
-
-    # Write to CSV
+            writers["invoices"].writerow([inv_id, j_id, job_date, job_date + datetime.timedelta(days=30), subtotal, tax, total, profit, payment_status])
+            invoice_count += 1
+            
+            job_id_counter += 1
+            invoice_id_counter += 1
+
+
+    # Stream each CSV directly into the archive — no scratch files to
+    # write, re-read, and delete
     output_dir = Path("tmp/mock_datasets")
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    scenario_dir = output_dir / scenario_name
-    scenario_dir.mkdir(exist_ok=True)
-    
-    write_csv(scenario_dir / "customers.csv", ["CustomerID", "Name", "Address", "Phone", "Email"], customers)
-    write_csv(scenario_dir / "quotes.csv", ["QuoteID", "CustomerID", "Date", "Description", "Status"], quotes)
-    write_csv(scenario_dir / "jobs.csv", ["JobID", "QuoteID", "CustomerID", "JobType", "Status"], jobs)
-    write_csv(scenario_dir / "schedule.csv", ["JobID", "Technician", "StartTime", "EndTime"], schedule)
-    write_csv(scenario_dir / "invoices.csv", ["InvoiceID", "JobID", "Date", "DueDate", "Subtotal", "Tax", "Total", "EstProfit", "Status"], invoices)
-    write_csv(scenario_dir / "invoice_items.csv", ["InvoiceID", "Item", "Quantity", "UnitPrice", "LineTotal"], invoice_items)
-    write_csv(scenario_dir / "materials_list.csv", ["ItemName", "UnitCost", "SellPrice"], [[k, v[0], v[1]] for k,v in MATERIALS.items()])
-
-    # Zip files
-    files_to_zip = ["customers.csv", "quotes.csv", "jobs.csv", "schedule.csv", "invoices.csv", "invoice_items.csv", "materials_list.csv"]
     zip_filename = output_dir / f"{scenario_name}.zip"
-    
-    with zipfile.ZipFile(zip_filename, 'w') as zipf:
-        for file in files_to_zip:
-            file_path = scenario_dir / file
-            zipf.write(file_path, arcname=file)
-    
-    # Clean up individual CSVs (keep directory structure)
-    for file in files_to_zip:
-        (scenario_dir / file).unlink()
-    scenario_dir.rmdir()
-    
-    print(f"  ✓ Generated {len(customers)} customers, {len(jobs)} jobs, {len(invoices)} invoices")
+
+    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for t in table_headers:
+            zipf.writestr(f"{t}.csv", buffers[t].getvalue())
+        zip_csv(zipf, "materials_list.csv", ["ItemName", "UnitCost", "SellPrice"], [[k, v[0], v[1]] for k,v in MATERIALS.items()])
+
+    print(f"  ✓ Generated {customer_count} customers, {job_count} jobs, {invoice_count} invoices")
     print(f"  ✓ Saved to {zip_filename}")
     return zip_filename
 
@@ -15,8 +15,13 @@ import os
 import sys
 from pathlib import Path
 
+# Opt in to the Rust transfer backend before the hub client imports; it
+# parallelizes multipart chunks natively for large bundles. No-op when
+# hf_transfer is not installed.
+os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 try:
-    from huggingface_hub import HfApi, create_repo
+    from huggingface_hub import CommitOperationAdd, HfApi, create_repo
 except ImportError:
     print("ERROR: huggingface_hub not installed. Run: pip install huggingface_hub", file=sys.stderr)
     sys.exit(1)
@@ -57,51 +62,39 @@ def push_dataset(bundle_dir: str, repo: str, token: str, private: bool, commit_m
         print(f"ERROR: Failed to create repo: {e}", file=sys.stderr)
         sys.exit(1)
     
-    # Upload files
+    # Upload everything as one commit; the hub client batches the
+    # transfers in parallel instead of one HTTPS round-trip per file
     try:
-        # Upload main dataset
-        dataset_result = api.upload_file(
-            path_or_fileobj=str(dataset_path),
-            path_in_repo="dataset.jsonl",
-            repo_id=repo,
-            repo_type="dataset",
-            commit_message=commit_message,
-            token=token,
-        )
-        print(f"[HF Push] Uploaded dataset.jsonl")
-        
-        # Upload info
-        info_result = api.upload_file(
-            path_or_fileobj=str(info_path),
-            path_in_repo="dataset_info.json",
+        operations = [
+            CommitOperationAdd(path_in_repo="dataset.jsonl", path_or_fileobj=str(dataset_path)),
+            CommitOperationAdd(path_in_repo="dataset_info.json", path_or_fileobj=str(info_path)),
+        ]
+
+        splits_dir = bundle_path / "splits"
+        if splits_dir.exists():
+            for split_file in sorted(splits_dir.glob("*.jsonl")):
+                operations.append(
+                    CommitOperationAdd(
+                        path_in_repo=f"splits/{split_file.name}",
+                        path_or_fileobj=str(split_file),
+                    )
+                )
+
+        commit_info = api.create_commit(
             repo_id=repo,
             repo_type="dataset",
+            operations=operations,
             commit_message=commit_message,
             token=token,
         )
-        print(f"[HF Push] Uploaded dataset_info.json")
-        
-        # Upload splits if present
-        splits_dir = bundle_path / "splits"
-        if splits_dir.exists():
-            for split_file in splits_dir.glob("*.jsonl"):
-                split_result = api.upload_file(
-                    path_or_fileobj=str(split_file),
-                    path_in_repo=f"splits/{split_file.name}",
-                    repo_id=repo,
-                    repo_type="dataset",
-                    commit_message=f"{commit_message} (split={split_file.stem})",
-                    token=token,
-                )
-                print(f"[HF Push] Uploaded splits/{split_file.name}")
-        
-        # Extract revision from result
-        # HF API returns a CommitInfo object with commit_url
-        revision = dataset_result.split("/")[-1] if dataset_result else "unknown"
+        for op in operations:
+            print(f"[HF Push] Uploaded {op.path_in_repo}")
+
+        revision = getattr(commit_info, "oid", None) or str(commit_info).split("/")[-1]
         print(f"revision:{revision}")
-        
+
         print("[HF Push] ✓ Push complete")
-        
+
     except Exception as e:
         print(f"ERROR: Upload failed: {e}", file=sys.stderr)
         sys.exit(1)
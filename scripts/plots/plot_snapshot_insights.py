@@ -7,90 +7,144 @@ Usage:
 """
 
 import argparse
-import csv
+import bisect
+import functools
+import re
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional
+
+import matplotlib
+
+# Headless CLI: Agg skips any GUI canvas setup
+matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+_NON_NUMERIC_RE = re.compile(r"[^0-9.\-]")
 
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p")
+_last_format_idx = 0
 
+
+@functools.lru_cache(maxsize=None)
 def parse_date(value: str) -> Optional[datetime]:
+  global _last_format_idx
   if not value:
     return None
-  for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M %p"):
+  cleaned = value.strip()
+  # Exports repeat one format (and often the same strings), so cache parsed
+  # results and try the format that matched last time before the others
+  for i in range(len(_DATE_FORMATS)):
+    idx = (_last_format_idx + i) % len(_DATE_FORMATS)
     try:
-      return datetime.strptime(value.strip(), fmt)
+      parsed = datetime.strptime(cleaned, _DATE_FORMATS[idx])
+      _last_format_idx = idx
+      return parsed
     except ValueError:
       continue
   try:
-    return datetime.fromisoformat(value.strip().replace("Z", ""))
+    return datetime.fromisoformat(cleaned.replace("Z", ""))
   except ValueError:
     return None
 
 
+@functools.lru_cache(maxsize=4096)
 def parse_float(value: str) -> Optional[float]:
+  # Totals repeat heavily in exports, so cache by raw string and strip
+  # currency characters with one C-level regex substitution
   if not value:
     return None
-  cleaned = "".join(ch for ch in value if (ch.isdigit() or ch in ".-"))
   try:
-    return float(cleaned)
+    return float(_NON_NUMERIC_RE.sub("", value))
   except ValueError:
     return None
 
 
-def pick_value(row: dict, keys: List[str]) -> Optional[str]:
-  for key in keys:
-    if key in row and row[key]:
-      return row[key]
+def read_csv_table(path: Path) -> pd.DataFrame:
+  if not path.exists():
+    return pd.DataFrame()
+  # pandas' C engine parses the whole file in one pass; columns stay raw
+  # strings so the typed conversions below control cleanup
+  df = pd.read_csv(path, dtype=str, keep_default_na=False)
+  df.columns = [str(c).strip().lower() for c in df.columns]
+  return df
+
+
+def pick_column(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+  for name in candidates:
+    if name in df.columns:
+      return name
   return None
 
 
-def read_csv_rows(path: Path) -> List[dict]:
-  if not path.exists():
-    return []
-  with path.open("r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    rows = []
-    for row in reader:
-      rows.append({k.strip().lower(): (v or "").strip() for k, v in row.items() if k})
-    return rows
-
-
-def get_invoice_points(rows: List[dict]) -> List[Tuple[datetime, float]]:
-  points = []
-  for row in rows:
-    date_raw = pick_value(row, ["issued_at", "issued date", "issued_date", "created_at", "created date", "date"])
-    total_raw = pick_value(row, ["total", "amount", "total ($)", "total$", "total_amount"])
-    date = parse_date(date_raw or "")
-    total = parse_float(total_raw or "")
-    if date and total is not None:
-      points.append((date, total))
-  return sorted(points, key=lambda x: x[0])
-
-
-def get_quote_dates(rows: List[dict]) -> List[datetime]:
-  dates = []
-  for row in rows:
-    date_raw = pick_value(row, ["created_at", "created date", "date", "issued_at"])
-    date = parse_date(date_raw or "")
-    if date:
-      dates.append(date)
-  return dates
+def parse_date_column(series: pd.Series) -> pd.Series:
+  """Vectorized datetime parse with a per-value fallback for odd formats"""
+  try:
+    parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+  except (TypeError, ValueError):
+    parsed = pd.to_datetime(series, errors="coerce")
+  missing = parsed.isna() & series.astype(bool)
+  if missing.any():
+    parsed = parsed.copy()
+    parsed[missing] = series[missing].map(parse_date)
+  return parsed
+
+
+def parse_total_column(series: pd.Series) -> pd.Series:
+  cleaned = series.str.replace(_NON_NUMERIC_RE, "", regex=True)
+  totals = pd.to_numeric(cleaned, errors="coerce")
+  missing = totals.isna() & series.astype(bool)
+  if missing.any():
+    totals = totals.copy()
+    totals[missing] = series[missing].map(parse_float)
+  return totals
+
+
+def get_invoice_points(df: pd.DataFrame):
+  date_col = pick_column(df, ["issued_at", "issued date", "issued_date", "created_at", "created date", "date"])
+  total_col = pick_column(df, ["total", "amount", "total ($)", "total$", "total_amount"])
+  if df.empty or date_col is None or total_col is None:
+    return np.array([], dtype="datetime64[s]"), np.array([], dtype=np.float64)
+  dates = parse_date_column(df[date_col])
+  totals = parse_total_column(df[total_col])
+  mask = dates.notna() & totals.notna()
+  dates_np = dates[mask].to_numpy(dtype="datetime64[s]")
+  totals_np = totals[mask].to_numpy(dtype=np.float64)
+  order = np.argsort(dates_np, kind="stable")
+  return dates_np[order], totals_np[order]
+
+
+def get_quote_dates(df: pd.DataFrame) -> np.ndarray:
+  date_col = pick_column(df, ["created_at", "created date", "date", "issued_at"])
+  if df.empty or date_col is None:
+    return np.array([], dtype="datetime64[s]")
+  dates = parse_date_column(df[date_col])
+  return dates[dates.notna()].to_numpy(dtype="datetime64[s]")
 
 
 def rolling_median(values: List[float], window: int = 7) -> List[float]:
   if not values:
     return []
+  # Maintain the window as a sorted list updated by bisect insert/remove
+  # instead of re-sorting the whole slice at every step; a deque tracks
+  # arrival order for eviction
   out = []
-  for i in range(len(values)):
-    start = max(0, i - window + 1)
-    subset = sorted(values[start : i + 1])
-    mid = len(subset) // 2
-    if len(subset) % 2 == 1:
-      out.append(subset[mid])
+  ordered: List[float] = []
+  recent = deque()
+  for value in values:
+    recent.append(value)
+    bisect.insort(ordered, value)
+    if len(recent) > window:
+      ordered.pop(bisect.bisect_left(ordered, recent.popleft()))
+    mid = len(ordered) // 2
+    if len(ordered) % 2 == 1:
+      out.append(ordered[mid])
     else:
-      out.append((subset[mid - 1] + subset[mid]) / 2)
+      out.append((ordered[mid - 1] + ordered[mid]) / 2)
   return out
 
 
@@ -109,52 +163,53 @@ def resolve_bundle_from_run_id(run_id: str) -> Optional[Path]:
 def plot_snapshot_insights(quotes_csv: Path, invoices_csv: Path, output_dir: Path):
   output_dir.mkdir(parents=True, exist_ok=True)
 
-  quote_rows = read_csv_rows(quotes_csv)
-  invoice_rows = read_csv_rows(invoices_csv)
+  quotes_df = read_csv_table(quotes_csv)
+  invoices_df = read_csv_table(invoices_csv)
+
+  dates, totals = get_invoice_points(invoices_df)
+  quote_dates_np = get_quote_dates(quotes_df)
 
-  invoice_points = get_invoice_points(invoice_rows)
-  quote_dates = get_quote_dates(quote_rows)
+  # One figure/axes pair reused for all three charts; rebuilding the
+  # canvas per chart dominates runtime for plots this small
+  fig, ax = plt.subplots(figsize=(8, 4))
 
   # Plot 1: Scatter invoice total vs date with rolling median
-  if invoice_points:
-    dates = [p[0] for p in invoice_points]
-    totals = [p[1] for p in invoice_points]
-    median = rolling_median(totals, window=7)
-
-    plt.figure(figsize=(8, 4))
-    plt.scatter(dates, totals, alpha=0.6, s=20)
-    plt.plot(dates, median, color="orange", linewidth=2)
-    plt.title("Invoice totals over time")
-    plt.xlabel("Date")
-    plt.ylabel("Invoice total")
-    plt.tight_layout()
-    plt.savefig(output_dir / "invoice_scatter.png")
-    plt.close()
+  if dates.size:
+    median = rolling_median(totals.tolist(), window=7)
+
+    ax.scatter(dates, totals, alpha=0.6, s=20)
+    ax.plot(dates, median, color="orange", linewidth=2)
+    ax.set_title("Invoice totals over time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Invoice total")
+    fig.tight_layout()
+    fig.savefig(output_dir / "invoice_scatter.png")
+    ax.clear()
 
   # Plot 2: Histogram of invoice totals
-  if invoice_points:
-    totals = [p[1] for p in invoice_points]
-    plt.figure(figsize=(6, 4))
-    plt.hist(totals, bins=12, color="#0f766e", alpha=0.8)
-    plt.title("Invoice total distribution")
-    plt.xlabel("Invoice total")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    plt.savefig(output_dir / "invoice_hist.png")
-    plt.close()
-
-  # Plot 3: Histogram of quote ages
-  if quote_dates:
-    as_of = max(quote_dates)
-    ages = [(as_of - d).days for d in quote_dates if d <= as_of]
-    plt.figure(figsize=(6, 4))
-    plt.hist(ages, bins=12, color="#2563eb", alpha=0.8)
-    plt.title("Quote age distribution (days)")
-    plt.xlabel("Age (days)")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    plt.savefig(output_dir / "quote_age_hist.png")
-    plt.close()
+  if dates.size:
+    fig.set_size_inches(6, 4)
+    ax.hist(totals, bins=12, color="#0f766e", alpha=0.8)
+    ax.set_title("Invoice total distribution")
+    ax.set_xlabel("Invoice total")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    fig.savefig(output_dir / "invoice_hist.png")
+    ax.clear()
+
+  # Plot 3: Histogram of quote ages, computed as one datetime64 delta
+  if quote_dates_np.size:
+    as_of = quote_dates_np.max()
+    ages = (as_of - quote_dates_np).astype("timedelta64[D]").astype(int)
+    fig.set_size_inches(6, 4)
+    ax.hist(ages, bins=12, color="#2563eb", alpha=0.8)
+    ax.set_title("Quote age distribution (days)")
+    ax.set_xlabel("Age (days)")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    fig.savefig(output_dir / "quote_age_hist.png")
+
+  plt.close(fig)
 
 
 def main():
@@ -4,13 +4,16 @@ Extracts and validates data structure from each ZIP
 """
 import zipfile
 import csv
+import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 def validate_dataset(zip_path):
-    """Validate a dataset ZIP file"""
-    print(f"\n{'='*60}")
-    print(f"Validating: {zip_path.name}")
-    print('='*60)
+    """Validate a dataset ZIP file; returns (valid, report_text)"""
+    lines = []
+    lines.append(f"\n{'='*60}")
+    lines.append(f"Validating: {zip_path.name}")
+    lines.append('='*60)
     
     required_files = [
         "customers.csv",
@@ -28,52 +31,58 @@ def validate_dataset(zip_path):
         # Check all required files present
         missing = [f for f in required_files if f not in files_in_zip]
         if missing:
-            print(f"❌ Missing files: {missing}")
-            return False
+            lines.append(f"❌ Missing files: {missing}")
+            return False, "\n".join(lines)
         
-        print("✓ All required files present")
+        lines.append("✓ All required files present")
         
-        # Validate each CSV
+        # Validate each CSV in a streaming pass — only the header and one
+        # sample row are held in memory, the rest is counted as it decodes
         for filename in required_files:
-            with zf.open(filename) as f:
-                reader = csv.reader(f.read().decode('utf-8').splitlines())
-                rows = list(reader)
-                header = rows[0]
-                data_rows = rows[1:]
-                
-                print(f"\n{filename}:")
-                print(f"  Headers: {', '.join(header)}")
-                print(f"  Rows: {len(data_rows):,}")
-                
-                if len(data_rows) == 0:
-                    print(f"  ⚠️  Warning: Empty dataset")
-                
-                # Show sample row
-                if len(data_rows) > 0:
-                    sample = data_rows[0]
-                    print(f"  Sample: {sample[:3]}...")
-        
-        # Calculate key metrics
-        with zf.open('quotes.csv') as f:
-            quotes = list(csv.DictReader(f.read().decode('utf-8').splitlines()))
-            total_quotes = len(quotes)
-            accepted = sum(1 for q in quotes if q['Status'] == 'Accepted')
+            with zf.open(filename) as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as txt:
+                reader = csv.reader(txt)
+                header = next(reader)
+                sample = next(reader, None)
+                row_count = (1 if sample is not None else 0) + sum(1 for _ in reader)
+
+                lines.append(f"\n{filename}:")
+                lines.append(f"  Headers: {', '.join(header)}")
+                lines.append(f"  Rows: {row_count:,}")
+
+                if row_count == 0:
+                    lines.append(f"  ⚠️  Warning: Empty dataset")
+
+                if sample is not None:
+                    lines.append(f"  Sample: {sample[:3]}...")
+
+        # Calculate key metrics, one streamed pass per file
+        with zf.open('quotes.csv') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as txt:
+            total_quotes = 0
+            accepted = 0
+            for q in csv.DictReader(txt):
+                total_quotes += 1
+                if q['Status'] == 'Accepted':
+                    accepted += 1
             close_rate = (accepted / total_quotes * 100) if total_quotes > 0 else 0
-            
-        with zf.open('invoices.csv') as f:
-            invoices = list(csv.DictReader(f.read().decode('utf-8').splitlines()))
-            paid = sum(1 for i in invoices if i['Status'] == 'Paid')
-            total_inv = len(invoices)
+
+        with zf.open('invoices.csv') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as txt:
+            total_inv = 0
+            paid = 0
+            total_revenue = 0.0
+            for i in csv.DictReader(txt):
+                total_inv += 1
+                if i['Status'] == 'Paid':
+                    paid += 1
+                total_revenue += float(i['Total'])
             paid_rate = (paid / total_inv * 100) if total_inv > 0 else 0
-            total_revenue = sum(float(i['Total']) for i in invoices)
-            
-        print(f"\n📊 Key Metrics:")
-        print(f"  Quote Close Rate: {close_rate:.1f}%")
-        print(f"  Payment Rate: {paid_rate:.1f}%")
-        print(f"  Total Revenue: ${total_revenue:,.2f}")
-        print(f"  Avg Invoice: ${total_revenue/len(invoices):,.2f}")
-        
-    return True
+
+        lines.append(f"\n📊 Key Metrics:")
+        lines.append(f"  Quote Close Rate: {close_rate:.1f}%")
+        lines.append(f"  Payment Rate: {paid_rate:.1f}%")
+        lines.append(f"  Total Revenue: ${total_revenue:,.2f}")
+        lines.append(f"  Avg Invoice: ${total_revenue/total_inv:,.2f}")
+
+    return True, "\n".join(lines)
 
 if __name__ == "__main__":
     datasets_dir = Path("tmp/mock_datasets")
@@ -89,20 +98,26 @@ if __name__ == "__main__":
     
     print(f"Found {len(zip_files)} datasets\n")
     
+    # Each ZIP is independent, so fan validation out across processes and
+    # print the collected reports on the main thread to keep output tidy
     results = {}
-    for zip_file in zip_files:
-        try:
-            valid = validate_dataset(zip_file)
-            results[zip_file.stem] = "✓ Valid" if valid else "❌ Invalid"
-        except Exception as e:
-            print(f"❌ Error validating {zip_file.name}: {e}")
-            results[zip_file.stem] = "❌ Error"
+    with ProcessPoolExecutor() as pool:
+        futures = {pool.submit(validate_dataset, zp): zp for zp in zip_files}
+        for future in as_completed(futures):
+            zip_file = futures[future]
+            try:
+                valid, report = future.result()
+                print(report)
+                results[zip_file.stem] = "✓ Valid" if valid else "❌ Invalid"
+            except Exception as e:
+                print(f"❌ Error validating {zip_file.name}: {e}")
+                results[zip_file.stem] = "❌ Error"
     
     print(f"\n{'='*60}")
     print("Summary")
     print('='*60)
-    for name, status in results.items():
-        print(f"{status} - {name}")
+    for zip_file in zip_files:
+        print(f"{results[zip_file.stem]} - {zip_file.stem}")
     
     all_valid = all("✓" in v for v in results.values())
     print(f"\n{'✓ All datasets valid!' if all_valid else '❌ Some datasets had issues'}")
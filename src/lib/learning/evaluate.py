@@ -11,27 +11,44 @@ Usage:
 import argparse
 import json
 import sqlite3
+import zlib
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict, List
 import numpy as np
+import pandas as pd
 from sklearn.metrics import (
-    mean_absolute_error, 
-    accuracy_score, 
+    mean_absolute_error,
+    accuracy_score,
     precision_recall_fscore_support,
-    confusion_matrix
 )
 import joblib
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
-    """Load training examples from SQLite database"""
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+# Only the columns the evaluators read; skipping the unused blob columns
+# (labels in particular) keeps them out of the fetch entirely
+DATASET_COLUMNS = ["id", "created_at", "run_id", "source", "industry",
+                   "features", "targets"]
+
+
+def iter_dataset(db_path: str, filters: Dict[str, Any] = None):
+    """Stream training examples from the SQLite database one row at a time"""
     conn = sqlite3.connect(db_path)
+    # Serve large databases from OS mmap with a bigger page cache
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-200000")
     cursor = conn.cursor()
-    
-    query = "SELECT * FROM training_examples WHERE 1=1"
+
+    query = f"SELECT {', '.join(DATASET_COLUMNS)} FROM training_examples WHERE 1=1"
     params = []
-    
+
     if filters:
         if filters.get("source"):
             query += " AND source = ?"
@@ -39,70 +56,107 @@ def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
         if filters.get("industry"):
             query += " AND industry = ?"
             params.append(filters["industry"])
-    
+
     query += " ORDER BY created_at DESC"
-    
+
     cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    
-    columns = ["id", "created_at", "run_id", "source", "industry", 
-               "feature_schema", "pipeline_version", "generator_version",
-               "features", "targets", "labels", "indexed_at"]
-    
-    examples = []
-    for row in rows:
-        example = dict(zip(columns, row))
-        example["features"] = json.loads(example["features"])
-        example["targets"] = json.loads(example["targets"])
-        if example["labels"]:
-            example["labels"] = json.loads(example["labels"])
-        examples.append(example)
-    
-    return examples
+    cursor.arraysize = 1000
 
+    try:
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                example = dict(zip(DATASET_COLUMNS, row))
+                example["features"] = json_loads(example["features"])
+                example["targets"] = json_loads(example["targets"])
+                yield example
+    finally:
+        conn.close()
 
-def extract_feature_matrix(examples: List[Dict], feature_names: List[str]) -> np.ndarray:
-    """Convert examples to feature matrix using specified feature names"""
-    X = []
-    for ex in examples:
-        row = []
-        for key in feature_names:
-            val = ex["features"].get(key)
-            if val is None:
-                row.append(0.0)
-            elif isinstance(val, bool):
-                row.append(1.0 if val else 0.0)
-            elif isinstance(val, (int, float)):
-                row.append(float(val))
-            else:
-                row.append(float(hash(str(val)) % 1000))
-        X.append(row)
-    return np.array(X)
-
-
-def evaluate_calibrator(model_dir: Path, examples: List[Dict]) -> Dict:
+
+def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
+    """Materialize the streamed examples for callers that need a list"""
+    return list(iter_dataset(db_path, filters))
+
+
+def load_model_metadata(model_dir: Path) -> Dict:
+    """Load a model's metadata.json"""
+    with open(model_dir / "metadata.json") as f:
+        return json.load(f)
+
+
+def _encode_categorical(series: "pd.Series") -> "pd.Series":
+    """Map a non-numeric column to stable float codes, one hash per value"""
+    codes: Dict[str, float] = {}
+
+    def encode(val: Any) -> float:
+        if val is None or (isinstance(val, float) and val != val):
+            return 0.0
+        if isinstance(val, bool):
+            return 1.0 if val else 0.0
+        if isinstance(val, (int, float)):
+            return float(val)
+        text = str(val)
+        code = codes.get(text)
+        if code is None:
+            # Must match the encoding train.py uses for string features
+            code = float(zlib.crc32(text.encode("utf-8")) & 0x3FF)
+            codes[text] = code
+        return code
+
+    return series.map(encode)
+
+
+def build_feature_matrix(examples: List[Dict], feature_names: List[str]) -> np.ndarray:
+    """Vectorize all examples once over the union of feature names.
+
+    pandas assembles one buffer per column from the feature dicts, so the
+    per-cell isinstance branching only runs for the categorical columns.
+    Each model slices out the columns it was trained on afterwards.
+    """
+    if not examples:
+        return np.zeros((0, len(feature_names)), dtype=np.float32)
+    df = pd.json_normalize([ex["features"] for ex in examples], max_level=0)
+    df = df.reindex(columns=feature_names, fill_value=0.0)
+    bool_cols = df.select_dtypes(include="bool").columns
+    if len(bool_cols):
+        df[bool_cols] = df[bool_cols].astype(np.float32)
+    for column in df.select_dtypes(exclude="number").columns:
+        df[column] = _encode_categorical(df[column])
+    # float32 halves the bytes streamed through each model's predict; the
+    # encoded features are small counts, rates, and hash codes well within
+    # single-precision range
+    return df.fillna(0.0).to_numpy(dtype=np.float32)
+
+
+def select_model_columns(X: np.ndarray, name_to_col: Dict[str, int],
+                         feature_names: List[str]) -> np.ndarray:
+    """Slice the shared matrix down to the columns a model was trained on"""
+    return X[:, [name_to_col[name] for name in feature_names]]
+
+
+def evaluate_calibrator(model_dir: Path, metadata: Dict, examples: List[Dict],
+                        X_all: np.ndarray, name_to_col: Dict[str, int]) -> Dict:
     """Evaluate calibration model"""
     print(f"\n[EVAL CALIBRATOR] Evaluating on {len(examples)} examples...")
-    
-    # Load model and metadata
+
+    # Load model
     model = joblib.load(model_dir / "model.pkl")
-    with open(model_dir / "metadata.json") as f:
-        metadata = json.load(f)
-    
-    # Extract features
-    X = extract_feature_matrix(examples, metadata["feature_names"])
-    
+
+    # Slice shared features
+    X = select_model_columns(X_all, name_to_col, metadata["feature_names"])
+
     # Extract targets
-    y = []
-    for ex in examples:
+    def avg_percentile(ex: Dict) -> float:
         metrics = ex["targets"].get("benchmark_metrics", [])
         if metrics:
-            avg_percentile = np.mean([m["percentile"] for m in metrics])
-            y.append(avg_percentile)
-        else:
-            y.append(50.0)
-    y = np.array(y)
+            return sum(m["percentile"] for m in metrics) / len(metrics)
+        return 50.0
+
+    y = np.fromiter((avg_percentile(ex) for ex in examples),
+                    dtype=np.float64, count=len(examples))
     
     # Predict
     y_pred = model.predict(X)
@@ -127,47 +181,45 @@ def evaluate_calibrator(model_dir: Path, examples: List[Dict]) -> Dict:
     return results
 
 
-def evaluate_pressure_selector(model_dir: Path, examples: List[Dict]) -> Dict:
+def evaluate_pressure_selector(model_dir: Path, metadata: Dict, examples: List[Dict],
+                               X_all: np.ndarray, name_to_col: Dict[str, int]) -> Dict:
     """Evaluate pressure selection model"""
     print(f"\n[EVAL PRESSURE] Evaluating on {len(examples)} examples...")
-    
-    # Load model and metadata
+
+    # Load model and key set
     model = joblib.load(model_dir / "model.pkl")
-    with open(model_dir / "metadata.json") as f:
-        metadata = json.load(f)
     with open(model_dir / "pressure_keys.json") as f:
         pressure_keys = json.load(f)
-    
-    # Extract features
-    X = extract_feature_matrix(examples, metadata["feature_names"])
-    
-    # Extract targets
-    y = []
-    for ex in examples:
-        active_keys = set(ex["targets"].get("pressure_keys", []))
-        row = [1 if key in active_keys else 0 for key in pressure_keys]
-        y.append(row)
-    y = np.array(y)
-    
+
+    # Slice shared features
+    X = select_model_columns(X_all, name_to_col, metadata["feature_names"])
+    
+    # Build the label matrix into one int8 buffer keyed by column index
+    key_to_col = {key: j for j, key in enumerate(pressure_keys)}
+    y = np.zeros((len(examples), len(pressure_keys)), dtype=np.int8)
+    for i, ex in enumerate(examples):
+        for key in ex["targets"].get("pressure_keys", ()):
+            j = key_to_col.get(key)
+            if j is not None:
+                y[i, j] = 1
+
     # Predict
     y_pred = model.predict(X)
-    
-    # Compute precision@3, recall
-    precision_at_3 = []
-    recall_scores = []
-    
-    for true_row, pred_row in zip(y, y_pred):
-        # Top 3 predictions
-        top_3_indices = np.argsort(pred_row)[-3:]
-        true_indices = np.where(true_row == 1)[0]
-        
-        if len(true_indices) > 0:
-            hits = len(set(top_3_indices) & set(true_indices))
-            precision_at_3.append(hits / 3.0)
-            recall_scores.append(hits / len(true_indices))
-    
-    avg_precision_at_3 = np.mean(precision_at_3) if precision_at_3 else 0.0
-    avg_recall = np.mean(recall_scores) if recall_scores else 0.0
+
+    # Precision@3 and recall over all rows at once; argpartition picks the
+    # top predictions in O(K) per row without a full sort
+    k = min(3, len(pressure_keys))
+    top_idx = np.argpartition(y_pred, -k, axis=1)[:, -k:]
+    hits = np.take_along_axis(y, top_idx, axis=1).sum(axis=1)
+    true_counts = y.sum(axis=1)
+    has_truth = true_counts > 0
+
+    if has_truth.any():
+        avg_precision_at_3 = np.mean(hits[has_truth] / 3.0)
+        avg_recall = np.mean(hits[has_truth] / true_counts[has_truth])
+    else:
+        avg_precision_at_3 = 0.0
+        avg_recall = 0.0
     f1 = 2 * (avg_precision_at_3 * avg_recall) / (avg_precision_at_3 + avg_recall) if (avg_precision_at_3 + avg_recall) > 0 else 0.0
     
     results = {
@@ -187,21 +239,20 @@ def evaluate_pressure_selector(model_dir: Path, examples: List[Dict]) -> Dict:
     return results
 
 
-def evaluate_boundary_classifier(model_dir: Path, examples: List[Dict]) -> Dict:
+def evaluate_boundary_classifier(model_dir: Path, metadata: Dict, examples: List[Dict],
+                                 X_all: np.ndarray, name_to_col: Dict[str, int]) -> Dict:
     """Evaluate boundary classifier"""
     print(f"\n[EVAL BOUNDARY] Evaluating on {len(examples)} examples...")
-    
-    # Load model and metadata
+
+    # Load model and class names
     model = joblib.load(model_dir / "model.pkl")
-    with open(model_dir / "metadata.json") as f:
-        metadata = json.load(f)
     with open(model_dir / "class_names.json") as f:
         class_names = json.load(f)
-    
+
     class_to_idx = {c: i for i, c in enumerate(class_names)}
-    
-    # Extract features
-    X = extract_feature_matrix(examples, metadata["feature_names"])
+
+    # Slice shared features
+    X = select_model_columns(X_all, name_to_col, metadata["feature_names"])
     
     # Extract targets
     y = []
@@ -215,25 +266,24 @@ def evaluate_boundary_classifier(model_dir: Path, examples: List[Dict]) -> Dict:
     
     # Metrics
     accuracy = accuracy_score(y, y_pred)
-    
-    # Compute false-safe rate (CRITICAL)
-    false_safe_count = 0
-    total_unsafe = 0
-    for true_label, pred_label in zip(y, y_pred):
-        if true_label != class_to_idx["stable"] and true_label != class_to_idx["unknown"]:
-            total_unsafe += 1
-            if pred_label == class_to_idx["stable"]:
-                false_safe_count += 1
-    
+
+    # Compute false-safe rate (CRITICAL) with masked vector ops
+    stable_idx = class_to_idx["stable"]
+    unknown_idx = class_to_idx["unknown"]
+    unsafe_mask = (y != stable_idx) & (y != unknown_idx)
+    total_unsafe = int(unsafe_mask.sum())
+    false_safe_count = int((y_pred[unsafe_mask] == stable_idx).sum())
+
     false_safe_rate = false_safe_count / total_unsafe if total_unsafe > 0 else 0.0
-    
-    # Confusion matrix
-    cm = confusion_matrix(y, y_pred)
-    confusion_dict = {}
-    for i, true_class in enumerate(class_names):
-        confusion_dict[true_class] = {}
-        for j, pred_class in enumerate(class_names):
-            confusion_dict[true_class][pred_class] = int(cm[i][j])
+
+    # Confusion matrix from one bincount over flattened (true, pred) pairs
+    n_classes = len(class_names)
+    cm = np.bincount(y * n_classes + y_pred, minlength=n_classes * n_classes)
+    cm = cm.reshape(n_classes, n_classes)
+    confusion_dict = {
+        true_class: dict(zip(class_names, row))
+        for true_class, row in zip(class_names, cm.tolist())
+    }
     
     results = {
         "model_name": "boundary_classifier",
@@ -309,23 +359,35 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Evaluate models
+    # Discover models and collect the union of their feature names so the
+    # examples are vectorized exactly once
+    evaluators = [
+        ("calibrator", evaluate_calibrator),
+        ("pressure_selector", evaluate_pressure_selector),
+        ("boundary_classifier", evaluate_boundary_classifier),
+    ]
+
+    model_runs = []
+    union_feature_names = []
+    seen_names = set()
+    for name, evaluate_fn in evaluators:
+        model_dir = models_dir / name / "v1"
+        if not model_dir.exists():
+            continue
+        metadata = load_model_metadata(model_dir)
+        for feature_name in metadata["feature_names"]:
+            if feature_name not in seen_names:
+                seen_names.add(feature_name)
+                union_feature_names.append(feature_name)
+        model_runs.append((model_dir, metadata, evaluate_fn))
+
+    X_all = build_feature_matrix(examples, union_feature_names)
+    name_to_col = {name: j for j, name in enumerate(union_feature_names)}
+
+    # Evaluate models against views of the shared matrix
     results = []
-    
-    # Calibrator
-    calibrator_dir = models_dir / "calibrator" / "v1"
-    if calibrator_dir.exists():
-        results.append(evaluate_calibrator(calibrator_dir, examples))
-    
-    # Pressure selector
-    pressure_dir = models_dir / "pressure_selector" / "v1"
-    if pressure_dir.exists():
-        results.append(evaluate_pressure_selector(pressure_dir, examples))
-    
-    # Boundary classifier
-    boundary_dir = models_dir / "boundary_classifier" / "v1"
-    if boundary_dir.exists():
-        results.append(evaluate_boundary_classifier(boundary_dir, examples))
+    for model_dir, metadata, evaluate_fn in model_runs:
+        results.append(evaluate_fn(model_dir, metadata, examples, X_all, name_to_col))
     
     # Save results
     results_json_path = output_dir / "evaluation_results.json"
@@ -3,6 +3,7 @@ Learning Layer - Model Inference Script
 """
 
 import argparse
+import functools
 import json
 from pathlib import Path
 import sys
@@ -12,7 +13,11 @@ import joblib
 scripts_dir = Path(__file__).resolve().parents[3] / "packages" / "learning" / "scripts"
 sys.path.append(str(scripts_dir))
 
-from feature_schema import FEATURE_KEYS, vectorize_features
+from feature_schema import COLUMN_HANDLERS, FEATURE_KEYS
+
+# Key/handler pairs resolved once at import so the fill loop below does no
+# per-cell branching
+_COERCERS = list(zip(FEATURE_KEYS, COLUMN_HANDLERS))
 
 
 def latest_model_dir(models_dir: Path, name: str):
@@ -23,13 +28,18 @@ def latest_model_dir(models_dir: Path, name: str):
     return versions[-1] if versions else None
 
 
-def load_models(models_dir: Path):
+@functools.lru_cache(maxsize=4)
+def load_models(models_dir_str: str):
+    # Cached per models directory so repeated in-process calls reuse the
+    # unpickled models; mmap_mode="r" keeps the array pages in the OS cache
+    # across CLI invocations as well
+    models_dir = Path(models_dir_str)
     models = {}
 
     calibrator_path = latest_model_dir(models_dir, "calibrator")
     if calibrator_path and (calibrator_path / "model.pkl").exists():
         models["calibrator"] = {
-            "model": joblib.load(calibrator_path / "model.pkl"),
+            "model": joblib.load(calibrator_path / "model.pkl", mmap_mode="r"),
             "version": (json.load(open(calibrator_path / "metadata.json"))["version"]
                         if (calibrator_path / "metadata.json").exists() else calibrator_path.name),
         }
@@ -37,7 +47,7 @@ def load_models(models_dir: Path):
     pressure_path = latest_model_dir(models_dir, "pressure_selector")
     if pressure_path and (pressure_path / "model.pkl").exists():
         models["pressure_selector"] = {
-            "model": joblib.load(pressure_path / "model.pkl"),
+            "model": joblib.load(pressure_path / "model.pkl", mmap_mode="r"),
             "pressure_keys": json.load(open(pressure_path / "pressure_keys.json")),
             "version": (json.load(open(pressure_path / "metadata.json"))["version"]
                         if (pressure_path / "metadata.json").exists() else pressure_path.name),
@@ -46,7 +56,7 @@ def load_models(models_dir: Path):
     boundary_path = latest_model_dir(models_dir, "boundary_classifier")
     if boundary_path and (boundary_path / "model.pkl").exists():
         models["boundary_classifier"] = {
-            "model": joblib.load(boundary_path / "model.pkl"),
+            "model": joblib.load(boundary_path / "model.pkl", mmap_mode="r"),
             "class_names": json.load(open(boundary_path / "class_names.json")),
             "version": (json.load(open(boundary_path / "metadata.json"))["version"]
                         if (boundary_path / "metadata.json").exists() else boundary_path.name),
@@ -55,64 +65,107 @@ def load_models(models_dir: Path):
     return models
 
 
+def vectorize_into(features: dict, out: np.ndarray, row: int) -> None:
+    """Write one feature dict into a row of a preallocated matrix"""
+    for j, (key, handler) in enumerate(_COERCERS):
+        out[row, j] = handler(features.get(key))
+
+
+def features_to_matrix(feature_dicts: list) -> np.ndarray:
+    # float32 halves the bytes moved through predict; the trained models
+    # accept single precision
+    X = np.empty((len(feature_dicts), len(FEATURE_KEYS)), dtype=np.float32)
+    for i, features in enumerate(feature_dicts):
+        vectorize_into(features, X, i)
+    return X
+
+
 def features_to_array(features: dict) -> np.ndarray:
-    row = vectorize_features(features)
-    return np.array([row], dtype=float)
+    return features_to_matrix([features])
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Run inference with learned models")
-    parser.add_argument("--models", required=True, help="Path to models directory")
-    parser.add_argument("--features", required=True, help="Features JSON string")
-    
-    args = parser.parse_args()
-    
-    # Load features
-    features = json.loads(args.features)
-    
-    models_dir = Path(args.models)
-    models = load_models(models_dir)
-    
-    results = {}
+def run_inference(models: dict, X: np.ndarray) -> list:
+    """Run every available model once over the whole (N, F) batch.
+
+    One predict call per model amortizes sklearn's per-call dispatch and
+    validation overhead across the batch; the single-features CLI path is
+    just a batch of one.
+    """
+    n = X.shape[0]
+    results = [{} for _ in range(n)]
     model_versions = {}
-    
+
     # Calibrator
     if "calibrator" in models:
         m = models["calibrator"]
-        X = features_to_array(features)
-        pred = m["model"].predict(X)[0]
-        results["calibrated_percentiles"] = {"avg": float(pred)}
+        preds = m["model"].predict(X)
+        for i in range(n):
+            results[i]["calibrated_percentiles"] = {"avg": float(preds[i])}
         model_versions["calibrator"] = m.get("version")
-    
+
     # Pressure selector
     if "pressure_selector" in models:
         m = models["pressure_selector"]
-        X = features_to_array(features)
         if hasattr(m["model"], "predict_proba"):
-            scores = m["model"].predict_proba(X)[0]
+            scores = m["model"].predict_proba(X)
         else:
-            scores = m["model"].decision_function(X)[0]
-        top_indices = np.argsort(scores)[-3:][::-1]
-        suggested = [m["pressure_keys"][i] for i in top_indices]
-        results["pressure_keys"] = suggested
+            scores = m["model"].decision_function(X)
+        # Partial selection: O(K) partition for the top 3, then sort only
+        # the winners for presentation order
+        k = min(3, scores.shape[1])
+        top_indices = np.argpartition(scores, -k, axis=1)[:, -k:]
+        order = np.argsort(np.take_along_axis(scores, top_indices, axis=1), axis=1)[:, ::-1]
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        for i in range(n):
+            results[i]["pressure_keys"] = [m["pressure_keys"][j] for j in top_indices[i]]
         model_versions["pressure_selector"] = m.get("version")
-    
+
     # Boundary classifier
     if "boundary_classifier" in models:
         m = models["boundary_classifier"]
-        X = features_to_array(features)
-        pred = m["model"].predict(X)[0]
+        preds = m["model"].predict(X)
+        confidences = None
         if hasattr(m["model"], "predict_proba"):
-            pred_proba = m["model"].predict_proba(X)[0]
-            results["confidence"] = float(max(pred_proba))
-        results["boundary_class"] = m["class_names"][pred]
+            confidences = m["model"].predict_proba(X).max(axis=1)
+        for i in range(n):
+            if confidences is not None:
+                results[i]["confidence"] = float(confidences[i])
+            results[i]["boundary_class"] = m["class_names"][preds[i]]
         model_versions["boundary_classifier"] = m.get("version")
 
     if model_versions:
-        results["model_versions"] = model_versions
-    
+        for result in results:
+            result["model_versions"] = model_versions
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run inference with learned models")
+    parser.add_argument("--models", required=True, help="Path to models directory")
+    parser.add_argument("--features", help="Features JSON string")
+    parser.add_argument("--features-jsonl", help="Path to JSONL file of feature dicts (batch mode)")
+
+    args = parser.parse_args()
+
+    if not args.features and not args.features_jsonl:
+        parser.error("provide --features or --features-jsonl")
+
+    models = load_models(args.models)
+
+    if args.features_jsonl:
+        with open(args.features_jsonl, "r", encoding="utf-8") as f:
+            feature_dicts = [json.loads(line) for line in f if line.strip()]
+        X = features_to_matrix(feature_dicts)
+        for result in run_inference(models, X):
+            print(json.dumps(result))
+        return
+
+    features = json.loads(args.features)
+    results = run_inference(models, features_to_array(features))
+
     # Output JSON
-    print(json.dumps(results))
+    print(json.dumps(results[0] if results else {}))
 
 
 if __name__ == "__main__":
